@@ -1,5 +1,6 @@
 from django.contrib import admin
 
-from .models import Site
+from .models import Domain, Site
 
 admin.site.register(Site)
+admin.site.register(Domain)
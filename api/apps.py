@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from .checker import BACKENDS
+        from .matcher import get_matcher
+
+        if settings.PROFANITY_BACKEND not in BACKENDS:
+            raise ImproperlyConfigured(
+                f"PROFANITY_BACKEND must be one of {', '.join(BACKENDS)}."
+            )
+        if get_matcher() is None and settings.PROFANITY_BACKEND != "remote":
+            raise ImproperlyConfigured(
+                "PROFANITY_WORDLIST is required unless PROFANITY_BACKEND is remote."
+            )
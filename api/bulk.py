@@ -0,0 +1,94 @@
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .checker import Result, check_site, save_results
+from .models import Site
+from .utils import detail
+
+
+def validate_urls(urls):
+    if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+        raise ValidationError("Request body must be a list of URLs.")
+    urls = tuple(dict.fromkeys(urls))
+    if len(urls) > settings.BULK_CHECK_MAX_URLS:
+        raise ValidationError(
+            f"Ensure request body has at most {settings.BULK_CHECK_MAX_URLS} URLs (it has {len(urls)})."
+        )
+    return urls
+
+
+def check(url, site, links=None):
+    try:
+        Site.url.field.clean(url, None)
+        return url, check_site(url, site, links)
+    except ValidationError as exception:
+        return url, dict(
+            status=status.HTTP_400_BAD_REQUEST, **detail(exception.messages)
+        )
+    # Failures of the site or upstream, other errors are not the site's
+    except APIException as exception:
+        return url, dict(status=exception.status_code, **detail(exception.detail))
+    finally:
+        connections.close_all()
+
+
+def flush(results):
+    save_results(results)
+    results.clear()
+
+
+def check_sites(urls):
+    sites = Site.objects.by_urls(urls)
+    pending = defaultdict(deque)
+    for url in urls:
+        # Invalid URLs, which may have no host to group them by, are answered
+        # before any check starts
+        try:
+            Site.url.field.clean(url, None)
+        except ValidationError as exception:
+            yield dict(
+                url=url,
+                status=status.HTTP_400_BAD_REQUEST,
+                **detail(exception.messages),
+            )
+            continue
+        pending[urlsplit(url).hostname].append(url)
+    in_flight = defaultdict(int)
+    futures = {}
+    results = {}
+    with ThreadPoolExecutor(settings.BULK_CHECK_CONCURRENCY) as executor:
+        try:
+            while pending or futures:
+                for host in tuple(pending):
+                    while (
+                        pending[host]
+                        and len(futures) < settings.BULK_CHECK_CONCURRENCY
+                        and in_flight[host] < settings.BULK_CHECK_PER_HOST
+                    ):
+                        url = pending[host].popleft()
+                        futures[executor.submit(check, url, sites.get(url))] = host
+                        in_flight[host] += 1
+                    if not pending[host]:
+                        del pending[host]
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight[futures.pop(future)] -= 1
+                    url, result = future.result()
+                    if isinstance(result, Result):
+                        results[url] = result
+                        if len(results) >= settings.BULK_CHECK_BATCH_SIZE:
+                            flush(results)
+                        result = dict(contains_profanity=result.contains_profanity)
+                    yield dict(url=url, **result)
+        finally:
+            for future in futures:
+                future.cancel()
+            if results:
+                flush(results)
@@ -0,0 +1,334 @@
+import asyncio
+import hashlib
+from contextlib import aclosing, closing
+from dataclasses import dataclass, field
+from datetime import datetime
+from http import HTTPStatus
+
+from aiohttp import ClientError, ClientTimeout
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from urllib3.exceptions import DecodeError
+
+from . import parsing, purgomalum
+from .exceptions import PageStatusError
+from .extraction import TextExtractor
+from .fetcher import (
+    ACCEPT_ENCODING,
+    Decompressor,
+    content_charset,
+    content_length,
+    fetch,
+    page_error,
+)
+from .listing import update_listings
+from .matcher import get_matcher
+from .metrics import FETCHED_BYTES, count, stage
+from .models import Site, url_hash
+from .sessions import get_client_session
+
+BACKENDS = ("local", "remote", "crosscheck")
+
+HEADERS = {"User-Agent": "Magic Browser"}
+
+UPSERT_BATCH_SIZE = 1000
+
+
+@dataclass
+class Result:
+    contains_profanity: bool
+    etag: str = ""
+    last_modified: str = ""
+    fingerprint: str = ""
+    check_time: datetime = field(default_factory=timezone.now)
+
+    @classmethod
+    def unchanged(cls, site):
+        return cls(
+            site.contains_profanity, site.etag, site.last_modified, site.fingerprint
+        )
+
+
+class PageCheck:
+    def __init__(self, headers):
+        self.backend = settings.PROFANITY_BACKEND
+        self.scanner = None if self.backend == "remote" else get_matcher().scanner()
+        self.etag = header_value(headers.get("ETag"), Site.etag.field)
+        self.last_modified = header_value(
+            headers.get("Last-Modified"), Site.last_modified.field
+        )
+        self.unique_words = set()
+
+    @property
+    def needs_upstream(self):
+        return self.backend != "local"
+
+    def feed(self, words):
+        with stage("match"):
+            if self.scanner is not None and self.scanner.feed(words):
+                return True
+            self.unique_words.update(words)
+            return False
+
+    def feed_chunks(self, chunks, extractor, final=True):
+        # Whether a profane word was read from the chunks, or from the rest of
+        # the page buffered by the extractor if final
+        return any(self.feed(words) for words in read_words(chunks, extractor, final))
+
+    def feed_parsed(self, parsed, links):
+        contains_profanity, unique_words, found_links = parsed
+        self.unique_words.update(unique_words)
+        if links is not None:
+            links.extend(found_links)
+        return contains_profanity
+
+    def read(self, page, links=None):
+        # Whether a profane word was read. Pages of more than
+        # PARSE_INLINE_MAX_BYTES are parsed in the pool, if there is one
+        with page, closing(read_chunks(page)) as chunks:
+            if parsing.enabled():
+                chunks, body = parsing.buffer_page(
+                    chunks, content_length(page.headers.get("Content-Length"))
+                )
+                if body is not None:
+                    with body, stage("parse"):
+                        parsed = body.parse(
+                            page.charset,
+                            links is not None,
+                            page.url,
+                            self.scanner is not None,
+                        )
+                    return self.feed_parsed(parsed, links)
+            extractor = TextExtractor(page.charset, links, page.url)
+            return self.feed_chunks(chunks, extractor)
+
+    async def aread(self, response, links=None):
+        # Chunks are parsed and matched off the event loop, which a large page
+        # would otherwise hold for seconds
+        feed_chunks = sync_to_async(self.feed_chunks, thread_sensitive=False)
+        async with response, aclosing(aread_chunks(response)) as chunks:
+            charset = content_charset(response.headers.get("Content-Type"))
+            base_url = str(response.url)
+            if parsing.enabled():
+                head, body = await parsing.abuffer_page(
+                    chunks, content_length(response.headers.get("Content-Length"))
+                )
+                if body is not None:
+                    with body, stage("parse"):
+                        parsed = await body.aparse(
+                            charset,
+                            links is not None,
+                            base_url,
+                            self.scanner is not None,
+                        )
+                    return self.feed_parsed(parsed, links)
+                extractor = TextExtractor(charset, links, base_url)
+                return await feed_chunks(head, extractor)
+            extractor = TextExtractor(charset, links, base_url)
+            async for chunk in chunks:
+                if await feed_chunks((chunk,), extractor, final=False):
+                    return True
+            return await feed_chunks((), extractor)
+
+    def fingerprint(self):
+        with stage("match"):
+            words = "\n".join(sorted(self.unique_words))
+            return hashlib.sha256(words.encode()).hexdigest()
+
+    def result(self, contains_profanity, fingerprint=""):
+        return Result(contains_profanity, self.etag, self.last_modified, fingerprint)
+
+
+def header_value(value, field):
+    if value is None or len(value) > field.max_length:
+        return ""
+    return value
+
+
+def conditional_headers(site):
+    headers = dict(HEADERS)
+    if site is not None:
+        if site.etag:
+            headers["If-None-Match"] = site.etag
+        if site.last_modified:
+            headers["If-Modified-Since"] = site.last_modified
+    return headers
+
+
+def open_page(url, site):
+    page = fetch(url, conditional_headers(site))
+    if page.status == HTTPStatus.NOT_MODIFIED and site is not None:
+        page.close()
+        return None
+    return page
+
+
+def read_chunks(page):
+    with closing(page.chunks(settings.PAGE_CHUNK_SIZE)) as chunks:
+        while True:
+            with stage("read"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            count(FETCHED_BYTES, len(chunk))
+            yield chunk
+
+
+def read_words(chunks, extractor, final=True):
+    for chunk in chunks:
+        with stage("parse"):
+            words = extractor.feed_bytes(chunk)
+        yield words
+    if final:
+        with stage("parse"):
+            words = extractor.close()
+        yield words
+
+
+async def aopen_page(url, site):
+    try:
+        response = await get_client_session(auto_decompress=False).get(
+            url,
+            headers={**ACCEPT_ENCODING, **conditional_headers(site)},
+            timeout=ClientTimeout(
+                sock_connect=settings.FETCH_CONNECT_TIMEOUT,
+                sock_read=settings.FETCH_READ_TIMEOUT,
+            ),
+            max_redirects=settings.FETCH_MAX_REDIRECTS,
+        )
+    except (ClientError, asyncio.TimeoutError) as exception:
+        raise page_error(exception) from exception
+    if response.status == HTTPStatus.NOT_MODIFIED and site is not None:
+        response.release()
+        return None
+    if response.status >= 400:
+        response.release()
+        raise PageStatusError(response.status)
+    return response
+
+
+async def aread_chunks(response):
+    # Chunks are decompressed as Page.chunks does, at most PAGE_MAX_BYTES
+    remaining = settings.PAGE_MAX_BYTES
+    decompressor = Decompressor(
+        response.headers.get("Content-Encoding"), settings.PAGE_CHUNK_SIZE
+    )
+    while True:
+        with stage("read"):
+            try:
+                data = await response.content.read(settings.PAGE_CHUNK_SIZE)
+            except (ClientError, asyncio.TimeoutError) as exception:
+                raise page_error(exception) from exception
+        if not data:
+            return
+        try:
+            for chunk in decompressor.decompress(data):
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+                count(FETCHED_BYTES, len(chunk))
+                yield chunk
+                if remaining <= 0:
+                    return
+        except DecodeError as exception:
+            raise page_error(exception) from exception
+
+
+def check_site(url, site=None, links=None):
+    with stage("fetch"):
+        # Unchanged pages are not read, so crawls fetch them whole for their links
+        response = open_page(url, site if links is None else None)
+    if response is None:
+        return Result.unchanged(site)
+    page = PageCheck(response.headers)
+    if page.read(response, links):
+        return page.result(True)
+    fingerprint = page.fingerprint()
+    if not page.needs_upstream:
+        return page.result(False, fingerprint)
+    if site is not None and site.fingerprint == fingerprint:
+        return page.result(site.contains_profanity, fingerprint)
+    with stage("upstream"):
+        contains_profanity = purgomalum.contains_profanity(page.unique_words)
+    return page.result(contains_profanity, fingerprint)
+
+
+async def acheck_site(url, site=None, links=None):
+    with stage("fetch"):
+        # Unchanged pages are not read, so crawls fetch them whole for their links
+        response = await aopen_page(url, site if links is None else None)
+    if response is None:
+        return Result.unchanged(site)
+    page = PageCheck(response.headers)
+    if await page.aread(response, links):
+        return page.result(True)
+    fingerprint = page.fingerprint()
+    if not page.needs_upstream:
+        return page.result(False, fingerprint)
+    if site is not None and site.fingerprint == fingerprint:
+        return page.result(site.contains_profanity, fingerprint)
+    with stage("upstream"):
+        contains_profanity = await purgomalum.acontains_profanity(page.unique_words)
+    return page.result(contains_profanity, fingerprint)
+
+
+def upsert_sql(rows):
+    quote = connection.ops.quote_name
+    table = quote(Site._meta.db_table)
+    columns = [quote(model_field.column) for model_field in Site._meta.concrete_fields]
+    row = f"({', '.join(('%s',) * len(columns))})"
+    contains_profanity = quote(Site.contains_profanity.field.column)
+    last_check_time = quote(Site.last_check_time.field.column)
+    last_status_update_time = quote(Site.last_status_update_time.field.column)
+    updated = (
+        contains_profanity,
+        last_check_time,
+        *(quote(Site._meta.get_field(name).column) for name in Site.CONDITIONAL_FIELDS),
+    )
+    assignments = ", ".join(
+        (
+            *(f"{column} = EXCLUDED.{column}" for column in updated),
+            f"{last_status_update_time} = CASE"
+            f" WHEN {table}.{contains_profanity} = EXCLUDED.{contains_profanity}"
+            f" THEN {table}.{last_status_update_time}"
+            f" ELSE EXCLUDED.{last_status_update_time} END",
+        )
+    )
+    # Results checked before the stored one, e.g. flushed late, are dropped
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join((row,) * rows)}"
+        f" ON CONFLICT ({quote(Site.url.field.column)}) DO UPDATE SET {assignments}"
+        f" WHERE {table}.{last_check_time} <= EXCLUDED.{last_check_time}"
+        f" RETURNING {', '.join(columns)}"
+    )
+
+
+def save_results(results):
+    if not results:
+        return
+    sites = [
+        Site(
+            url=url,
+            url_hash=url_hash(url),
+            contains_profanity=result.contains_profanity,
+            last_check_time=result.check_time,
+            last_status_update_time=result.check_time,
+            etag=result.etag,
+            last_modified=result.last_modified,
+            fingerprint=result.fingerprint,
+        )
+        for url, result in results.items()
+    ]
+    fields = Site._meta.concrete_fields
+    batch_size = min(UPSERT_BATCH_SIZE, connection.ops.bulk_batch_size(fields, sites))
+    saved = []
+    for start in range(0, len(sites), batch_size):
+        batch = sites[start : start + batch_size]
+        params = [
+            model_field.get_db_prep_save(getattr(site, model_field.attname), connection)
+            for site in batch
+            for model_field in fields
+        ]
+        saved.extend(Site.objects.raw(upsert_sql(len(batch)), params))
+    update_listings(saved)
@@ -0,0 +1,132 @@
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from posixpath import splitext
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .bulk import check, flush
+from .checker import Result
+from .models import Domain, Site
+from .serializers import DomainSerializer
+from .singleflight import normalize_url
+
+# Links to these are not pages and would only be tokenized as noise
+# fmt: off
+SKIPPED_EXTENSIONS = frozenset(
+    (
+        ".7z", ".avi", ".css", ".csv", ".doc", ".docx", ".exe", ".gif", ".gz",
+        ".ico", ".jpeg", ".jpg", ".js", ".json", ".mov", ".mp3", ".mp4", ".pdf",
+        ".png", ".rar", ".svg", ".tar", ".wav", ".webm", ".webp", ".woff",
+        ".woff2", ".xls", ".xlsx", ".xml", ".zip",
+    )
+)
+# fmt: on
+
+
+def origin(url):
+    parts = urlsplit(normalize_url(url))
+    return f"{parts.scheme}://{parts.netloc.rpartition('@')[2]}"
+
+
+def crawlable(url, root_origin):
+    parts = urlsplit(url)
+    if (
+        parts.scheme not in ("http", "https")
+        or len(url) > Site.url.field.max_length
+        or splitext(parts.path)[1].lower() in SKIPPED_EXTENSIONS
+    ):
+        return False
+    try:
+        return origin(url) == root_origin
+    except ValidationError:  # e.g. a port out of range
+        return False
+
+
+def check_page(url):
+    site = Site.objects.by_url(url).first()
+    links = []
+    return (*check(url, site, links), links)
+
+
+def crawl(url, max_depth, max_pages, stop_on_hit):
+    domain = Domain(origin=origin(url), complete=True)
+    frontier = deque(((url, 0),))
+    seen = {normalize_url(url)}
+    futures = {}
+    results = {}
+    next_request = 0
+    stopped = False
+    with ThreadPoolExecutor(settings.CRAWL_CONCURRENCY) as executor:
+        try:
+            while (frontier or futures) and not stopped:
+                # Requests to the host start at least CRAWL_DELAY seconds apart
+                while (
+                    frontier
+                    and len(futures) < settings.CRAWL_CONCURRENCY
+                    and time.monotonic() >= next_request
+                ):
+                    page_url, depth = frontier.popleft()
+                    futures[executor.submit(check_page, page_url)] = depth
+                    next_request = time.monotonic() + settings.CRAWL_DELAY
+                timeout = None
+                if frontier and len(futures) < settings.CRAWL_CONCURRENCY:
+                    timeout = max(next_request - time.monotonic(), 0)
+                if not futures:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(futures, timeout, FIRST_COMPLETED)
+                for future in done:
+                    depth = futures.pop(future)
+                    page_url, result, links = future.result()
+                    if not isinstance(result, Result):
+                        domain.failed_pages += 1
+                        yield dict(url=page_url, depth=depth, **result)
+                        continue
+                    results[page_url] = result
+                    if len(results) >= settings.BULK_CHECK_BATCH_SIZE:
+                        flush(results)
+                    domain.pages_checked += 1
+                    if result.contains_profanity:
+                        domain.profane_pages += 1
+                        domain.first_profane_url = domain.first_profane_url or page_url
+                    if depth < max_depth:
+                        for link in links:
+                            if not crawlable(link, domain.origin):
+                                continue
+                            key = normalize_url(link)
+                            if key in seen:
+                                continue
+                            if len(seen) >= max_pages:
+                                domain.complete = False
+                                break
+                            seen.add(key)
+                            frontier.append((link, depth + 1))
+                    yield dict(
+                        url=page_url,
+                        depth=depth,
+                        contains_profanity=result.contains_profanity,
+                    )
+                    # Pages already checked along with it are still reported
+                    if result.contains_profanity and stop_on_hit:
+                        stopped = True
+        finally:
+            for future in futures:
+                future.cancel()
+            if results:
+                flush(results)
+            # Crawls are incomplete if pages failed, e.g. the root page, as
+            # their verdict and links are unknown
+            if frontier or futures or domain.failed_pages:
+                domain.complete = False
+            domain.contains_profanity = domain.profane_pages > 0
+            domain.last_crawl_time = timezone.now()
+            rollup = domain.to_dict()
+            del rollup[Domain.origin.field.name]
+            domain, _ = Domain.objects.update_or_create(
+                origin=domain.origin, defaults=rollup
+            )
+    yield DomainSerializer(domain).data
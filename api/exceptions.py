@@ -0,0 +1,33 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class UpstreamError(APIException):
+    status_code = status.HTTP_502_BAD_GATEWAY
+    default_detail = "Request to third-party API failed."
+    default_code = "upstream_error"
+
+
+class UpstreamTimeout(APIException):
+    status_code = status.HTTP_504_GATEWAY_TIMEOUT
+    default_detail = "Request to third-party API timed out."
+    default_code = "upstream_timeout"
+
+
+class PageError(APIException):
+    status_code = status.HTTP_502_BAD_GATEWAY
+    default_detail = "Could not fetch site."
+    default_code = "page_error"
+
+
+class PageStatusError(PageError):
+    default_code = "page_status_error"
+
+    def __init__(self, status_code):
+        super().__init__(f"Site responded with status code {status_code}.")
+
+
+class PageTimeout(APIException):
+    status_code = status.HTTP_504_GATEWAY_TIMEOUT
+    default_detail = "Request to site timed out."
+    default_code = "page_timeout"
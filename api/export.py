@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import models
+from drf_ujson.renderers import UJSONRenderer
+
+from .listing import serialize
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "json": UJSONRenderer.media_type}
+
+EXPORT_PARAM = models.CharField(
+    choices=[(export_format, export_format) for export_format in EXPORT_FORMATS]
+)
+
+
+def export_chunks(sites, separator):
+    # Rows are read through a server-side cursor and written a chunk at a
+    # time, so memory does not grow with the number of sites
+    chunk = []
+    for site in sites.iterator(chunk_size=settings.SITES_EXPORT_CHUNK_SIZE):
+        chunk.append(serialize(site))
+        if len(chunk) == settings.SITES_EXPORT_CHUNK_SIZE:
+            yield separator.join(chunk)
+            chunk.clear()
+    if chunk:
+        yield separator.join(chunk)
+
+
+def export_ndjson(sites):
+    for chunk in export_chunks(sites, b"\n"):
+        yield chunk + b"\n"
+
+
+def export_json(sites):
+    yield b"["
+    for index, chunk in enumerate(export_chunks(sites, b",")):
+        yield b"," + chunk if index else chunk
+    yield b"]"
+
+
+def export(sites, export_format):
+    if export_format == "ndjson":
+        return export_ndjson(sites)
+    return export_json(sites)
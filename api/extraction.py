@@ -0,0 +1,74 @@
+import codecs
+from html.parser import HTMLParser
+from urllib.parse import urldefrag, urljoin
+
+from .tokenizer import split_trailing_word, tokenize
+
+IGNORED_TAGS = frozenset(("script", "style", "template"))
+LINK_TAGS = frozenset(("a", "area", "base"))
+
+
+class TextExtractor(HTMLParser):
+    def __init__(self, encoding="utf-8", links=None, base_url=""):
+        super().__init__()
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self.ignored_depth = 0
+        self.pending = ""
+        self.words = []
+        # Absolute URLs of links are appended to links, if given
+        self.links = links
+        self.base_url = base_url
+
+    def feed_bytes(self, chunk):
+        self.feed(self.decoder.decode(chunk))
+        return self.pop_words()
+
+    def close(self):
+        self.feed(self.decoder.decode(b"", final=True))
+        super().close()
+        self.flush()
+        return self.pop_words()
+
+    def pop_words(self):
+        words, self.words = self.words, []
+        return words
+
+    def add_words(self, text):
+        self.words.extend(tokenize(text))
+
+    def flush(self):
+        if self.pending:
+            self.add_words(self.pending)
+            self.pending = ""
+
+    def handle_starttag(self, tag, attrs):
+        self.flush()
+        if tag in IGNORED_TAGS:
+            self.ignored_depth += 1
+        elif self.links is not None and tag in LINK_TAGS:
+            self.add_link(tag, dict(attrs).get("href"))
+
+    def add_link(self, tag, href):
+        if not href:
+            return
+        url = urljoin(self.base_url, href.strip())
+        if tag == "base":
+            self.base_url = url
+        else:
+            self.links.append(urldefrag(url).url)
+
+    def handle_endtag(self, tag):
+        self.flush()
+        if tag in IGNORED_TAGS and self.ignored_depth > 0:
+            self.ignored_depth -= 1
+
+    def handle_comment(self, data):
+        self.flush()
+
+    def handle_data(self, data):
+        if self.ignored_depth > 0:
+            return
+        # Text nodes may be cut at chunk boundaries, so the trailing word is
+        # kept until the node is known to end
+        text, self.pending = split_trailing_word(self.pending + data)
+        self.add_words(text)
@@ -0,0 +1,312 @@
+import asyncio
+import atexit
+import codecs
+import os
+import socket
+import threading
+import time
+import zlib
+from email.message import Message
+from urllib.parse import urljoin
+
+from aiohttp import (
+    ClientConnectorError,
+    ClientError,
+    ClientPayloadError,
+    ClientSSLError,
+    TooManyRedirects,
+)
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from urllib3 import PoolManager
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import (
+    ConnectTimeoutError,
+    DecodeError,
+    HTTPError,
+    MaxRetryError,
+    NewConnectionError,
+    ResponseError,
+    SSLError,
+)
+from urllib3.exceptions import TimeoutError as FetchTimeoutError
+from urllib3.util import Retry, Timeout, make_headers
+from urllib3.util.connection import allowed_gai_family
+
+from .exceptions import PageError, PageStatusError, PageTimeout
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Advertises brotli only if it is installed, as urllib3 decodes it with it
+ACCEPT_ENCODING = make_headers(accept_encoding=True)
+
+# The cache of resolved addresses is cleared once it holds this many hosts
+MAX_RESOLVED_HOSTS = 10000
+
+addresses = {}
+pool_manager = None
+pool_manager_lock = threading.Lock()
+
+
+class UnresolvedHost(NewConnectionError):
+    pass
+
+
+def resolve(host):
+    cached = addresses.get(host)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    address = socket.getaddrinfo(
+        host.strip("[]"), None, allowed_gai_family(), socket.SOCK_STREAM
+    )[0][4][0]
+    if len(addresses) >= MAX_RESOLVED_HOSTS:
+        addresses.clear()
+    addresses[host] = (time.monotonic() + settings.FETCH_DNS_TTL, address)
+    return address
+
+
+class ResolvingConnectionMixin:
+    def _new_conn(self):
+        # Only the connection goes to the cached address, the Host header and
+        # TLS server name are still taken from the host
+        host = self._dns_host
+        try:
+            self._dns_host = resolve(host)
+        except socket.gaierror as exception:
+            raise UnresolvedHost(self, f"Failed to resolve {host}.") from exception
+        try:
+            return super()._new_conn()
+        except ConnectTimeoutError:
+            addresses.pop(host, None)
+            raise
+        finally:
+            self._dns_host = host
+
+
+class ResolvingHTTPConnection(ResolvingConnectionMixin, HTTPConnection):
+    pass
+
+
+class ResolvingHTTPSConnection(ResolvingConnectionMixin, HTTPSConnection):
+    pass
+
+
+class ResolvingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = ResolvingHTTPConnection
+
+
+class ResolvingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = ResolvingHTTPSConnection
+
+
+def get_pool_manager():
+    global pool_manager
+    if pool_manager is None:
+        with pool_manager_lock:
+            if pool_manager is None:
+                new_pool_manager = PoolManager(
+                    num_pools=settings.FETCH_MAX_HOSTS,
+                    maxsize=settings.FETCH_POOL_SIZE,
+                    timeout=Timeout(
+                        connect=settings.FETCH_CONNECT_TIMEOUT,
+                        read=settings.FETCH_READ_TIMEOUT,
+                    ),
+                    retries=Retry(
+                        total=None,
+                        connect=0,
+                        read=0,
+                        other=0,
+                        redirect=settings.FETCH_MAX_REDIRECTS,
+                    ),
+                )
+                new_pool_manager.pool_classes_by_scheme = {
+                    "http": ResolvingHTTPConnectionPool,
+                    "https": ResolvingHTTPSConnectionPool,
+                }
+                pool_manager = new_pool_manager
+    return pool_manager
+
+
+def close_pool_manager():
+    global pool_manager
+    with pool_manager_lock:
+        if pool_manager is not None:
+            pool_manager.clear()
+            pool_manager = None
+
+
+def reset_pool_manager():
+    global pool_manager, pool_manager_lock
+    pool_manager = None
+    pool_manager_lock = threading.Lock()
+
+
+atexit.register(close_pool_manager)
+os.register_at_fork(after_in_child=reset_pool_manager)
+
+
+def content_charset(content_type, default="utf-8"):
+    message = Message()
+    message["Content-Type"] = content_type or ""
+    charset = message.get_content_charset(default)
+    try:
+        codecs.lookup(charset)
+    except LookupError:
+        return default
+    return charset
+
+
+def content_length(value):
+    # The size of the body as sent, which is only a hint of its size once
+    # decompressed
+    try:
+        length = int(value)
+    except (TypeError, ValueError):
+        return None
+    return length if length >= 0 else None
+
+
+DECOMPRESSION_ERRORS = (zlib.error,) if brotli is None else (zlib.error, brotli.error)
+
+
+def has_zlib_header(data):
+    return len(data) >= 2 and data[0] & 0x0F == 8 and (data[0] << 8 | data[1]) % 31 == 0
+
+
+class Decompressor:
+    # Decompresses a body about limit bytes at a time, so that a small
+    # compressed body cannot expand far past PAGE_MAX_BYTES within one read,
+    # as it would if each read were decompressed whole by urllib3 or aiohttp
+
+    def __init__(self, content_encoding, limit):
+        self.encoding = (content_encoding or "").strip().lower()
+        self.limit = limit
+        self.decompressor = None
+        if self.encoding in ("gzip", "x-gzip"):
+            self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.encoding == "br" and brotli is not None:
+            self.decompressor = brotli.Decompressor()
+        elif self.encoding != "deflate":
+            # Bodies in other encodings are read as they are, as urllib3 does
+            self.encoding = "identity"
+
+    def decompress(self, data):
+        try:
+            if self.encoding == "identity":
+                if data:
+                    yield data
+            elif self.encoding == "br":
+                yield from self.decompress_brotli(data)
+            else:
+                yield from self.decompress_zlib(data)
+        except DECOMPRESSION_ERRORS as exception:
+            raise DecodeError(f"Could not decode {self.encoding} body.") from exception
+
+    def decompress_brotli(self, data):
+        output = self.decompressor.process(data, output_buffer_limit=self.limit)
+        # Output is drained until none is left for the data given so far
+        while output and not self.decompressor.is_finished():
+            yield output
+            output = self.decompressor.process(b"", output_buffer_limit=self.limit)
+        if output:
+            yield output
+
+    def decompress_zlib(self, data):
+        if self.decompressor is None:
+            # Deflate bodies are sent with and without the zlib header
+            self.decompressor = zlib.decompressobj(
+                zlib.MAX_WBITS if has_zlib_header(data) else -zlib.MAX_WBITS
+            )
+        while data or self.decompressor.unconsumed_tail:
+            output = self.decompressor.decompress(data, self.limit)
+            data = self.decompressor.unconsumed_tail
+            if output:
+                yield output
+            if self.decompressor.eof:
+                data = self.decompressor.unused_data
+                if not data or self.encoding == "deflate":
+                    return
+                # The next member of a gzip body
+                self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            elif not data and len(output) < self.limit:
+                return
+
+
+def page_error(exception):
+    if isinstance(exception, MaxRetryError):
+        exception = exception.reason
+    if isinstance(exception, UnresolvedHost) or (
+        isinstance(exception, ClientConnectorError)
+        and isinstance(exception.os_error, socket.gaierror)
+    ):
+        return ValidationError("Could not resolve URL.")
+    # Failing to connect is a subclass of timing out to connect in urllib3, as
+    # failing to verify a certificate is of failing to connect in aiohttp
+    if isinstance(exception, (SSLError, ClientSSLError)):
+        return PageError("Could not establish a secure connection to site.")
+    if isinstance(exception, (NewConnectionError, ClientConnectorError)):
+        return PageError("Could not connect to site.")
+    if isinstance(exception, (FetchTimeoutError, asyncio.TimeoutError)):
+        return PageTimeout()
+    if isinstance(exception, (ResponseError, TooManyRedirects)):
+        return PageError("Site redirected too many times.")
+    if isinstance(exception, (DecodeError, ClientPayloadError)):
+        return PageError("Could not decode response of site.")
+    return PageError()
+
+
+class Page:
+    def __init__(self, url, response):
+        self.response = response
+        self.status = response.status
+        self.headers = response.headers
+        history = response.retries.history if response.retries else ()
+        self.url = (
+            urljoin(history[-1].url, history[-1].redirect_location) if history else url
+        )
+        self.charset = content_charset(response.headers.get("Content-Type"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def chunks(self, chunk_size):
+        # Chunks of at most chunk_size bytes are decompressed as they are read,
+        # and at most PAGE_MAX_BYTES of the decompressed body are read
+        remaining = settings.PAGE_MAX_BYTES
+        decompressor = Decompressor(self.headers.get("Content-Encoding"), chunk_size)
+        try:
+            for data in self.response.stream(chunk_size, decode_content=False):
+                for chunk in decompressor.decompress(data):
+                    yield chunk[:remaining]
+                    remaining -= len(chunk)
+                    if remaining <= 0:
+                        return
+        except HTTPError as exception:
+            raise page_error(exception) from exception
+
+    def close(self):
+        if not self.response.isclosed():
+            # Unread bytes of the body would be read by the next request
+            self.response.close()
+        self.response.release_conn()
+
+
+def fetch(url, headers):
+    try:
+        response = get_pool_manager().urlopen(
+            "GET", url, headers={**ACCEPT_ENCODING, **headers}, preload_content=False
+        )
+    except HTTPError as exception:
+        raise page_error(exception) from exception
+    page = Page(url, response)
+    if page.status >= 400:
+        page.close()
+        raise PageStatusError(page.status)
+    return page
@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+
+from .bulk import check
+from .checker import Result, save_results
+from .models import Job, Site
+
+# Finished jobs are deleted this many at a time, so as not to hold locks long
+PURGE_BATCH_SIZE = 1000
+
+
+def claim():
+    now = timezone.now()
+    expired = Q(status=Job.Status.RUNNING) & (
+        Q(claimed_time__isnull=True)
+        | Q(claimed_time__lt=now - timedelta(seconds=settings.JOB_LEASE_TIMEOUT))
+    )
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Job.Status.QUEUED) | expired)
+            .order_by(Job.created_time.field.name)
+            .first()
+        )
+        if job is not None:
+            Job.objects.filter(id=job.id).update(
+                status=Job.Status.RUNNING, claimed_time=now
+            )
+    return job
+
+
+def run(job):
+    try:
+        finish(job)
+    except Exception:
+        # e.g. a database error, the job fails rather than being left running
+        Job.objects.filter(id=job.id).update(
+            status=Job.Status.FAILED,
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not run job.",
+            finished_time=timezone.now(),
+        )
+        raise
+
+
+def finish(job):
+    site = Site.objects.by_url(job.url).first()
+    _, result = check(job.url, site)
+    if isinstance(result, Result):
+        save_results({job.url: result})
+        Job.objects.filter(id=job.id).update(
+            status=Job.Status.DONE,
+            contains_profanity=result.contains_profanity,
+            finished_time=timezone.now(),
+        )
+    else:
+        Job.objects.filter(id=job.id).update(
+            status=Job.Status.FAILED,
+            status_code=result["status"],
+            detail=result.get("detail") or " ".join(result["details"]),
+            finished_time=timezone.now(),
+        )
+
+
+def purge():
+    # Deletes jobs finished more than JOB_RETENTION seconds ago, returns how many
+    if not settings.JOB_RETENTION:
+        return 0
+    finished_before = timezone.now() - timedelta(seconds=settings.JOB_RETENTION)
+    jobs = Job.objects.filter(
+        status__in=(Job.Status.DONE, Job.Status.FAILED),
+        finished_time__lt=finished_before,
+    )
+    purged = 0
+    while True:
+        ids = list(jobs.values_list("id", flat=True)[:PURGE_BATCH_SIZE])
+        if not ids:
+            return purged
+        purged += Job.objects.filter(id__in=ids).delete()[0]
+        if len(ids) < PURGE_BATCH_SIZE:
+            return purged
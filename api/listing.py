@@ -0,0 +1,161 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
+from django_redis import get_redis_connection
+from redis.exceptions import LockError
+from drf_ujson.renderers import UJSONRenderer
+from ujson import loads
+
+from .metrics import count_cache
+from .models import Site
+from .serializers import SiteSerializer
+
+BUILT = b""
+# Marks sites removed from a listing while it is built, which the build would
+# otherwise add back from its older snapshot of the table
+REMOVED = b"-"
+
+HSET_IF_EXISTS = """
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    redis.call("HSET", KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+
+# Sites written while a listing is built are newer than the snapshot it is
+# built from, so the build does not overwrite them
+HSET_MISSING = """
+for i = 1, #ARGV, 2 do
+    redis.call("HSETNX", KEYS[1], ARGV[i], ARGV[i + 1])
+end
+"""
+
+# Requests finding no listing wait this long for another one building it, and
+# a build left behind by a killed process expires after it
+BUILD_TIMEOUT = 60
+
+# Serializing with one instance skips binding a serializer per site, which
+# dominates when many sites are serialized
+serializer = SiteSerializer()
+renderer = UJSONRenderer()
+
+
+def listing_key(contains_profanity):
+    return cache.make_key(f"sites:{contains_profanity}")
+
+
+def builds_key(key):
+    return key + ":builds"
+
+
+def serialize(site):
+    return renderer.render(serializer.to_representation(site))
+
+
+def build_listing(redis, contains_profanity, chunk_size=2000):
+    key = listing_key(contains_profanity)
+    lock = redis.lock(key + ":lock", timeout=BUILD_TIMEOUT)
+    # Without the lock after the timeout, the listing is built regardless, each
+    # build has its own key
+    locked = lock.acquire(blocking_timeout=BUILD_TIMEOUT)
+    try:
+        if redis.exists(key):
+            return
+        building_key = f"{key}:building:{uuid.uuid4().hex}"
+        redis.hset(building_key, BUILT, BUILT)
+        redis.expire(building_key, BUILD_TIMEOUT)
+        # Registered before the table is read, so that update_listings writes
+        # sites saved from now on into it as well
+        redis.sadd(builds_key(key), building_key)
+        redis.expire(builds_key(key), BUILD_TIMEOUT)
+        try:
+            sites = Site.objects.all()
+            if contains_profanity is not None:
+                sites = sites.filter(contains_profanity=contains_profanity)
+            hset_missing = redis.register_script(HSET_MISSING)
+            chunk = []
+            for site in sites.iterator(chunk_size=chunk_size):
+                chunk.extend((site.url, serialize(site)))
+                if len(chunk) == 2 * chunk_size:
+                    hset_missing(keys=(building_key,), args=chunk)
+                    redis.expire(building_key, BUILD_TIMEOUT)
+                    chunk.clear()
+            if chunk:
+                hset_missing(keys=(building_key,), args=chunk)
+            with redis.pipeline() as pipeline:
+                pipeline.rename(building_key, key)
+                # Sites changed other than through save_results, e.g. in the
+                # admin, are listed once the listing is rebuilt
+                pipeline.expire(key, settings.SITES_LISTING_TIMEOUT)
+                pipeline.execute()
+        finally:
+            redis.srem(builds_key(key), building_key)
+            redis.delete(building_key)
+    finally:
+        if locked:
+            try:
+                lock.release()
+            except LockError:  # expired and possibly taken by another build
+                pass
+
+
+def listed_values(values):
+    return (
+        b"["
+        + b",".join(value for value in values if value not in (BUILT, REMOVED))
+        + b"]"
+    )
+
+
+def get_listing(contains_profanity):
+    redis = get_redis_connection()
+    values = redis.hvals(listing_key(contains_profanity))
+    count_cache("listing", int(bool(values)), int(not values))
+    if not values:
+        build_listing(redis, contains_profanity)
+        values = redis.hvals(listing_key(contains_profanity))
+    return listed_values(values)
+
+
+def get_listed_site(url):
+    # The site as listed in the full listing, if it is built. Listings are
+    # updated after results are stored, so a site may be listed as checked
+    # earlier than it was
+    value = get_redis_connection().hget(listing_key(None), url)
+    count_cache("listing", int(value is not None), int(value is None))
+    if value is None or value in (BUILT, REMOVED):
+        return None
+    site = loads(value)
+    return dict(
+        contains_profanity=site["contains_profanity"],
+        last_check_time=parse_datetime(site["last_check_time"]),
+    )
+
+
+def update_listings(sites):
+    if not sites:
+        return
+    redis = get_redis_connection()
+    hset_if_exists = redis.register_script(HSET_IF_EXISTS)
+    keys = (listing_key(None), listing_key(True), listing_key(False))
+    with redis.pipeline(transaction=False) as pipeline:
+        for key in keys:
+            pipeline.smembers(builds_key(key))
+        builds = dict(zip(keys, pipeline.execute()))
+    with redis.pipeline(transaction=False) as pipeline:
+        for site in sites:
+            value = serialize(site)
+            for contains_profanity in (None, site.contains_profanity):
+                key = listing_key(contains_profanity)
+                for listed_key in (key, *builds[key]):
+                    hset_if_exists(
+                        keys=(listed_key,), args=(site.url, value), client=pipeline
+                    )
+            key = listing_key(not site.contains_profanity)
+            pipeline.hdel(key, site.url)
+            for building_key in builds[key]:
+                hset_if_exists(
+                    keys=(building_key,), args=(site.url, REMOVED), client=pipeline
+                )
+        pipeline.execute()
@@ -0,0 +1,108 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.bulk import check
+from api.checker import Result, save_results
+from api.models import Site
+
+
+class Command(BaseCommand):
+    help = "Re-check sites whose last check is older than max age, oldest first"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age",
+            type=int,
+            default=settings.RECHECK_MAX_AGE,
+            help="Seconds after which a site is re-checked",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.RECHECK_BATCH_SIZE,
+            help="Sites claimed and stored at a time",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.RECHECK_WORKERS,
+            help="Checks in flight",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=settings.RECHECK_RATE,
+            help="Maximum checks started per second, 0 for no limit",
+        )
+        parser.add_argument(
+            "--lease-timeout",
+            type=int,
+            default=settings.RECHECK_LEASE_TIMEOUT,
+            help="Seconds after which sites claimed but not re-checked are claimed again",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when no stale sites are left instead of waiting for more",
+        )
+        parser.add_argument(
+            "--idle-interval",
+            type=float,
+            default=60,
+            help="Seconds to wait when no stale sites are left",
+        )
+
+    def handle(self, *args, **options):
+        max_age = timedelta(seconds=options["max_age"])
+        lease_timeout = timedelta(seconds=options["lease_timeout"])
+        interval = 1 / options["rate"] if options["rate"] > 0 else 0
+        start = timezone.now()
+        with ThreadPoolExecutor(options["workers"]) as executor:
+            while True:
+                # Sites whose re-check failed are not claimed again by --once
+                now = start if options["once"] else timezone.now()
+                sites = claim(now - max_age, now - lease_timeout, options["batch_size"])
+                if not sites:
+                    if options["once"]:
+                        return
+                    time.sleep(options["idle_interval"])
+                    continue
+                futures = []
+                for site in sites.values():
+                    futures.append(executor.submit(check, site.url, site))
+                    time.sleep(interval)
+                results, failed = {}, 0
+                for future in futures:
+                    url, result = future.result()
+                    if isinstance(result, Result):
+                        results[url] = result
+                    else:
+                        failed += 1
+                        self.stderr.write(f"{url}: {result['detail']}")
+                save_results(results)
+                self.stdout.write(f"Re-checked {len(results)} sites, {failed} failed")
+
+
+def claim(checked_before, claimed_before, batch_size):
+    # Claims are kept apart from the last check time, which stays that of the
+    # last check stored until a re-check succeeds
+    with transaction.atomic():
+        sites = {
+            site.url: site
+            for site in Site.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(recheck_claimed_time__isnull=True)
+                | Q(recheck_claimed_time__lt=claimed_before),
+                last_check_time__lt=checked_before,
+            )
+            .order_by(Site.last_check_time.field.name)[:batch_size]
+        }
+        Site.objects.filter(url__in=sites).update(recheck_claimed_time=timezone.now())
+    return sites
@@ -0,0 +1,95 @@
+import logging
+import multiprocessing
+import signal
+import time
+from multiprocessing.connection import wait
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.jobs import claim, purge, run
+
+logger = logging.getLogger(__name__)
+
+# Seconds between deletions of expired finished jobs by each worker
+PURGE_INTERVAL = 60
+
+# Set in a worker once it is terminated, it then exits after its current job
+stopping = False
+
+
+class Command(BaseCommand):
+    help = "Run queued check jobs in a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help="Worker processes running jobs",
+        )
+        parser.add_argument(
+            "--idle-interval",
+            type=float,
+            default=1,
+            help="Seconds a worker waits when no job is queued",
+        )
+
+    def handle(self, *args, **options):
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+
+        def start():
+            process = context.Process(target=work, args=(options["idle_interval"],))
+            process.start()
+            return process
+
+        processes = [start() for _ in range(options["processes"])]
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        self.stdout.write(f"Started {len(processes)} job workers")
+        try:
+            while True:
+                wait([process.sentinel for process in processes])
+                for index, process in enumerate(processes):
+                    if process.exitcode is not None:
+                        # e.g. killed, its job is requeued once its lease expires
+                        self.stderr.write(
+                            f"Job worker {process.pid} exited with "
+                            f"{process.exitcode}, restarting it"
+                        )
+                        processes[index] = start()
+        except KeyboardInterrupt:
+            # Workers finish their current job before exiting, signals sent to
+            # the whole process group meanwhile reach them already
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+
+
+def stop(signum, frame):
+    global stopping
+    stopping = True
+
+
+def work(idle_interval):
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    purged_time = None
+    while not stopping:
+        try:
+            if purged_time is None or time.monotonic() - purged_time >= PURGE_INTERVAL:
+                purged_time = time.monotonic()
+                purge()
+            job = claim()
+            if job is None:
+                time.sleep(idle_interval)
+            else:
+                run(job)
+        except Exception:
+            logger.exception("Could not run job")
+            # Connections may be broken, e.g. by a database restart
+            connections.close_all()
+            time.sleep(idle_interval)
@@ -0,0 +1,108 @@
+import gc
+import os
+from argparse import BooleanOptionalAction
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from gunicorn.app.base import BaseApplication
+from prometheus_client import multiprocess
+
+
+class Application(BaseApplication):
+    def __init__(self, options, asgi):
+        self.options = options
+        self.asgi = asgi
+        super().__init__()
+
+    def load_config(self):
+        for name, value in self.options.items():
+            self.cfg.set(name, value)
+
+    def load(self):
+        # Loaded once before forking, along with the word list loaded as the
+        # app is set up, so that workers share their memory copy-on-write
+        if self.asgi:
+            from profanity_checker.asgi import application
+        else:
+            from profanity_checker.wsgi import application
+        # Connections would be shared by every worker
+        connections.close_all()
+        # Collecting garbage would write to the pages of every object loaded,
+        # copying them into each worker
+        gc.freeze()
+        return application
+
+
+def child_exit(server, worker):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(worker.pid)
+
+
+class Command(BaseCommand):
+    help = "Serve the API from preforked worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--bind",
+            default="127.0.0.1:8000",
+            help="Address and port to listen on",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.SERVE_WORKERS,
+            help="Worker processes",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=settings.SERVE_THREADS,
+            help="Threads of each WSGI worker",
+        )
+        parser.add_argument(
+            "--asgi",
+            action=BooleanOptionalAction,
+            default=settings.ASYNC_CHECK,
+            help="Serve profanity_checker.asgi with uvicorn workers",
+        )
+        parser.add_argument(
+            "--max-requests",
+            type=int,
+            default=settings.SERVE_MAX_REQUESTS,
+            help="Requests after which a worker is replaced, 0 to never replace",
+        )
+        parser.add_argument(
+            "--max-requests-jitter",
+            type=int,
+            default=settings.SERVE_MAX_REQUESTS_JITTER,
+            help="Upper bound of the random number of requests added to each",
+        )
+        parser.add_argument(
+            "--graceful-timeout",
+            type=int,
+            default=settings.SERVE_GRACEFUL_TIMEOUT,
+            help="Seconds workers have to finish requests when replaced",
+        )
+        parser.add_argument("--pidfile", help="File the PID is written to")
+
+    def handle(self, *args, **options):
+        asgi = options["asgi"]
+        Application(
+            dict(
+                bind=options["bind"],
+                workers=options["workers"],
+                # gthread rather than sync workers, which are killed after a
+                # request takes longer than the timeout, e.g. a crawl
+                worker_class="uvicorn.workers.UvicornWorker" if asgi else "gthread",
+                threads=options["threads"],
+                max_requests=options["max_requests"],
+                max_requests_jitter=options["max_requests_jitter"],
+                graceful_timeout=options["graceful_timeout"],
+                preload_app=True,
+                pidfile=options["pidfile"],
+                accesslog="-",
+                child_exit=child_exit,
+            ),
+            asgi,
+        ).run()
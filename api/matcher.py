@@ -0,0 +1,57 @@
+from functools import cache
+
+from django.conf import settings
+
+from .tokenizer import tokenize
+
+TERMINAL = None
+
+
+class ProfanityMatcher:
+    def __init__(self, phrases):
+        self.root = {}
+        for phrase in phrases:
+            node = self.root
+            for word in phrase:
+                node = node.setdefault(word, {})
+            node[TERMINAL] = True
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as file:
+            # Phrases are tokenized as pages are, e.g. "son of a bitch" matches
+            # the tokens "son", "of", "bitch"
+            phrases = tuple(
+                tuple(tokenize(line)) for line in file if not line.startswith("#")
+            )
+        return cls(phrase for phrase in phrases if phrase)
+
+    def scanner(self):
+        return Scanner(self.root)
+
+    def contains_profanity(self, words):
+        return self.scanner().feed(words)
+
+
+class Scanner:
+    def __init__(self, root):
+        self.root = root
+        self.nodes = ()
+
+    def feed(self, words):
+        nodes = self.nodes
+        # Words are tokens, already normalized as the phrases are
+        for word in words:
+            nodes = tuple(node[word] for node in (*nodes, self.root) if word in node)
+            for node in nodes:
+                if TERMINAL in node:
+                    return True
+        self.nodes = nodes
+        return False
+
+
+@cache
+def get_matcher():
+    if not settings.PROFANITY_WORDLIST:
+        return None
+    return ProfanityMatcher.from_file(settings.PROFANITY_WORDLIST)
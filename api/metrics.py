@@ -0,0 +1,122 @@
+import os
+import time
+from asyncio import iscoroutinefunction
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.decorators import sync_and_async_middleware
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+STAGE_SECONDS = Histogram(
+    "profanity_checker_stage_seconds",
+    "Time spent in each stage of a request",
+    ("route", "stage"),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+UPSTREAM_CHUNKS = Counter(
+    "profanity_checker_upstream_chunks", "Chunks of words sent to PurgoMalum"
+)
+FETCHED_BYTES = Counter("profanity_checker_fetched_bytes", "Bytes read from pages")
+CACHE_LOOKUPS = Counter(
+    "profanity_checker_cache_lookups",
+    "Lookups in the word verdict and sites listing caches",
+    ("cache", "result"),
+)
+
+timings = ContextVar("timings", default=None)
+
+# Read once, as the middleware and /metrics are only installed at startup
+ENABLED = settings.METRICS
+
+DISABLED = nullcontext()
+
+
+class Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        request_timings = timings.get()
+        if request_timings is not None:
+            request_timings[self.name] = (
+                request_timings.get(self.name, 0) + time.perf_counter() - self.start
+            )
+
+
+def stage(name):
+    # Stages of one request are summed, e.g. reading a page chunk by chunk
+    return Stage(name) if ENABLED else DISABLED
+
+
+def count(counter, amount=1, **labels):
+    if ENABLED and amount:
+        (counter.labels(**labels) if labels else counter).inc(amount)
+
+
+def count_cache(cache, hits, misses):
+    count(CACHE_LOOKUPS, hits, cache=cache, result="hit")
+    count(CACHE_LOOKUPS, misses, cache=cache, result="miss")
+
+
+def finish(request, response, request_timings, start):
+    if not request_timings:
+        return
+    request_timings["total"] = time.perf_counter() - start
+    route = request.resolver_match.route if request.resolver_match else ""
+    for name, seconds in request_timings.items():
+        STAGE_SECONDS.labels(route, name).observe(seconds)
+    response["Server-Timing"] = ", ".join(
+        f"{name};dur={seconds * 1000:.1f}" for name, seconds in request_timings.items()
+    )
+
+
+@sync_and_async_middleware
+def server_timing_middleware(get_response):
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            request_timings = {}
+            timings.set(request_timings)
+            start = time.perf_counter()
+            response = await get_response(request)
+            finish(request, response, request_timings, start)
+            return response
+
+    else:
+
+        def middleware(request):
+            request_timings = {}
+            token = timings.set(request_timings)
+            start = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                timings.reset(token)
+            finish(request, response, request_timings, start)
+            return response
+
+    return middleware
+
+
+def metrics(request):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
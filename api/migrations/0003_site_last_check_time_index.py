@@ -0,0 +1,19 @@
+# Generated by Django 4.1.4 on 2026-10-17 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_site_conditional_fields"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="site",
+            index=models.Index(
+                fields=["last_check_time"], name="api_site_last_ch_dffc77_idx"
+            ),
+        ),
+    ]
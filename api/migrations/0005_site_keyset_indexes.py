@@ -0,0 +1,30 @@
+# Generated by Django 4.1.4 on 2026-10-17 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_job"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="site",
+            name="api_site_last_ch_dffc77_idx",
+        ),
+        migrations.AddIndex(
+            model_name="site",
+            index=models.Index(
+                fields=["last_check_time", "url"], name="api_site_last_ch_707f98_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="site",
+            index=models.Index(
+                fields=["last_status_update_time", "url"],
+                name="api_site_last_st_961171_idx",
+            ),
+        ),
+    ]
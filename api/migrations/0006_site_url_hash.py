@@ -0,0 +1,59 @@
+# Generated by Django 4.1.4 on 2026-10-17 01:53
+
+import hashlib
+
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def url_hash(url):
+    digest = hashlib.blake2b(url.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def fill_url_hash(apps, schema_editor):
+    Site = apps.get_model("api", "Site")
+    batch = []
+    for site in Site.objects.only("url").iterator(chunk_size=BATCH_SIZE):
+        site.url_hash = url_hash(site.url)
+        batch.append(site)
+        if len(batch) >= BATCH_SIZE:
+            Site.objects.bulk_update(batch, ("url_hash",))
+            batch.clear()
+    Site.objects.bulk_update(batch, ("url_hash",))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_site_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="site",
+            name="url_hash",
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_url_hash, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="site",
+            name="url_hash",
+            field=models.BigIntegerField(db_index=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="site",
+            index=models.Index(
+                fields=["contains_profanity", "last_check_time", "url"],
+                name="api_site_contain_e74449_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="site",
+            index=models.Index(
+                fields=["contains_profanity", "last_status_update_time", "url"],
+                name="api_site_contain_9de765_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.1.4 on 2026-10-17 02:35
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_site_url_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Domain",
+            fields=[
+                (
+                    "origin",
+                    models.URLField(max_length=300, primary_key=True, serialize=False),
+                ),
+                ("contains_profanity", models.BooleanField(default=False)),
+                ("pages_checked", models.PositiveIntegerField(default=0)),
+                ("profane_pages", models.PositiveIntegerField(default=0)),
+                ("failed_pages", models.PositiveIntegerField(default=0)),
+                (
+                    "first_profane_url",
+                    models.URLField(blank=True, default="", max_length=2000),
+                ),
+                ("complete", models.BooleanField(default=False)),
+                (
+                    "last_crawl_time",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.4 on 2026-10-17 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_domain"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="claimed_time",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
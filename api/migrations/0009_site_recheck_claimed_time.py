@@ -0,0 +1,18 @@
+# Generated by Django 4.1.4 on 2026-10-17 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_job_claimed_time"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="site",
+            name="recheck_claimed_time",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.4 on 2026-10-17 03:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0009_site_recheck_claimed_time"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["finished_time"], name="api_job_finishe_1d2633_idx"
+            ),
+        ),
+    ]
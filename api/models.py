@@ -1,4 +1,6 @@
+import hashlib
 import itertools
+import uuid
 
 from django.db import models
 from django.utils import timezone
@@ -34,11 +36,96 @@ class BaseModel(models.Model):
         abstract = True
 
 
+def url_hash(url):
+    digest = hashlib.blake2b(url.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class SiteQuerySet(models.QuerySet):
+    def by_url(self, url):
+        return self.filter(url_hash=url_hash(url), url=url)
+
+    def by_urls(self, urls):
+        urls = set(urls)
+        sites = self.filter(url_hash__in={url_hash(url) for url in urls})
+        return {site.url: site for site in sites if site.url in urls}
+
+
 class Site(BaseModel):
+    CONDITIONAL_FIELDS = ("etag", "last_modified", "fingerprint")
+
     url = models.URLField(primary_key=True, max_length=2000)
+    url_hash = models.BigIntegerField(db_index=True, editable=False)
     contains_profanity = models.BooleanField()
     last_check_time = models.DateTimeField(default=timezone.now)
     last_status_update_time = models.DateTimeField(default=timezone.now)
+    etag = models.CharField(max_length=1000, blank=True, default="")
+    last_modified = models.CharField(max_length=64, blank=True, default="")
+    fingerprint = models.CharField(max_length=64, blank=True, default="")
+    # Claimed by manage.py recheck, which skips it for RECHECK_LEASE_TIMEOUT
+    recheck_claimed_time = models.DateTimeField(null=True, editable=False)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=("last_check_time", "url")),
+            models.Index(fields=("last_status_update_time", "url")),
+            models.Index(fields=("contains_profanity", "last_check_time", "url")),
+            models.Index(
+                fields=("contains_profanity", "last_status_update_time", "url")
+            ),
+        )
+
+    objects = SiteQuerySet.as_manager()
 
     def __str__(self):
         return self.url
+
+    def save(self, *args, **kwargs):
+        self.url_hash = url_hash(self.url)
+        super().save(*args, **kwargs)
+
+
+class Job(BaseModel):
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    url = models.URLField(max_length=2000)
+    status = models.CharField(
+        max_length=7, choices=Status.choices, default=Status.QUEUED
+    )
+    contains_profanity = models.BooleanField(null=True, blank=True)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    detail = models.TextField(blank=True, default="")
+    created_time = models.DateTimeField(default=timezone.now)
+    # Running jobs claimed more than JOB_LEASE_TIMEOUT ago are claimed again
+    claimed_time = models.DateTimeField(null=True, blank=True)
+    finished_time = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=("status", "created_time")),
+            models.Index(fields=("finished_time",)),
+        )
+
+    def __str__(self):
+        return str(self.id)
+
+
+class Domain(BaseModel):
+    origin = models.URLField(primary_key=True, max_length=300)
+    contains_profanity = models.BooleanField(default=False)
+    pages_checked = models.PositiveIntegerField(default=0)
+    profane_pages = models.PositiveIntegerField(default=0)
+    failed_pages = models.PositiveIntegerField(default=0)
+    first_profane_url = models.URLField(max_length=2000, blank=True, default="")
+    # Whether every page within the crawl depth was checked, i.e. the crawl
+    # neither ran out of pages nor stopped at the first profane page
+    complete = models.BooleanField(default=False)
+    last_crawl_time = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.origin
@@ -0,0 +1,59 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.utils.dateparse import parse_datetime
+from rest_framework.utils.urls import replace_query_param
+from ujson import JSONDecodeError, dumps, loads
+
+from .models import Site
+
+ORDER_BY_FIELDS = (Site.last_check_time.field, Site.last_status_update_time.field)
+
+ORDER_BY_PARAM = models.CharField(
+    choices=[(field.name, field.name) for field in ORDER_BY_FIELDS]
+)
+
+CURSOR_PARAM = models.CharField()
+
+PAGE_SIZE_PARAM = models.PositiveIntegerField()
+
+
+def encode_cursor(site, order_by):
+    value = getattr(site, order_by).isoformat()
+    return base64.urlsafe_b64encode(dumps((value, site.url)).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        value, url = loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = parse_datetime(value)
+    except (binascii.Error, JSONDecodeError, TypeError, ValueError):
+        value = None
+    if value is None:
+        raise ValidationError("Invalid cursor.")
+    return value, url
+
+
+def paginate(request, sites, order_by, cursor=None, page_size=None):
+    if page_size is None:
+        page_size = settings.SITES_PAGE_SIZE
+    if not 0 < page_size <= settings.SITES_MAX_PAGE_SIZE:
+        raise ValidationError(
+            f"Parameter 'page_size' must be between 1 and {settings.SITES_MAX_PAGE_SIZE}."
+        )
+    if cursor is not None:
+        value, url = decode_cursor(cursor)
+        sites = sites.filter(**{f"{order_by}__gte": value}).exclude(
+            **{order_by: value, "url__lte": url}
+        )
+    sites = list(sites.order_by(order_by, Site.url.field.name)[: page_size + 1])
+    next_url = None
+    if len(sites) > page_size:
+        sites = sites[:page_size]
+        next_url = replace_query_param(
+            request.build_absolute_uri(), "cursor", encode_cursor(sites[-1], order_by)
+        )
+    return sites, next_url
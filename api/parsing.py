@@ -0,0 +1,275 @@
+import asyncio
+import atexit
+import os
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+from django.conf import settings
+
+from .exceptions import PageError
+from .extraction import TextExtractor
+from .matcher import ProfanityMatcher
+
+# Pool processes read pages in chunks of this many bytes, they have no settings
+CHUNK_SIZE = 64 * 1024
+
+# Pool processes are forked from a server process rather than from processes
+# serving requests, whose threads may hold locks while forking
+CONTEXT = get_context("forkserver")
+CONTEXT.set_forkserver_preload(["api.parsing"])
+
+# Seconds between attempts of async checks to take a body slot
+BODY_SLOT_INTERVAL = 0.01
+
+pool = None
+pool_tasks = 0
+pool_lock = threading.Lock()
+
+# At most PARSE_PROCESSES bodies are held in shared memory at a time, the
+# others wait to be read, so that shared memory is not exhausted
+body_slots = None
+
+# The matcher of a pool process
+worker_matcher = None
+
+
+def init_worker(wordlist):
+    global worker_matcher
+    worker_matcher = ProfanityMatcher.from_file(wordlist) if wordlist else None
+
+
+def enabled():
+    return settings.PARSE_PROCESSES > 0
+
+
+def submit(*args):
+    # Pages are submitted while holding the lock, so that no other thread
+    # replaces the pool in between. Returns the pool and the future
+    global pool, pool_tasks
+    with pool_lock:
+        if pool is not None and pool_tasks >= settings.PARSE_MAX_TASKS:
+            # Pages already submitted are still parsed by the old processes
+            pool.shutdown(wait=False)
+            pool = None
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                settings.PARSE_PROCESSES,
+                CONTEXT,
+                init_worker,
+                (settings.PROFANITY_WORDLIST,),
+            )
+            pool_tasks = 0
+            # Processes are started along with the pool rather than by pages
+            for _ in range(settings.PARSE_PROCESSES):
+                pool.submit(int)
+        pool_tasks += 1
+        submitted_pool = pool
+        try:
+            return submitted_pool, submitted_pool.submit(parse_page, *args)
+        except BrokenExecutor:
+            pool = None
+            raise
+
+
+def discard_pool(broken_pool):
+    global pool
+    with pool_lock:
+        if pool is broken_pool:
+            pool = None
+
+
+def get_body_slots():
+    global body_slots
+    with pool_lock:
+        if body_slots is None:
+            body_slots = threading.BoundedSemaphore(settings.PARSE_PROCESSES)
+        return body_slots
+
+
+def acquire_body():
+    get_body_slots().acquire()
+
+
+async def aacquire_body():
+    # Waiting in a thread would leak the slot of a cancelled check, so the
+    # event loop polls instead
+    slots = get_body_slots()
+    while not slots.acquire(blocking=False):
+        await asyncio.sleep(BODY_SLOT_INTERVAL)
+
+
+def release_body():
+    get_body_slots().release()
+
+
+def close_pool():
+    global pool
+    with pool_lock:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+            pool = None
+
+
+def reset_pool():
+    global pool, pool_lock, body_slots
+    pool = None
+    pool_lock = threading.Lock()
+    body_slots = None
+
+
+atexit.register(close_pool)
+os.register_at_fork(after_in_child=reset_pool)
+
+
+def extract_words(buffer, size, extractor):
+    for start in range(0, size, CHUNK_SIZE):
+        # Decoding reads the chunk in place, its view is released before the
+        # shared memory is closed
+        with buffer[start : min(start + CHUNK_SIZE, size)] as chunk:
+            words = extractor.feed_bytes(chunk)
+        yield words
+    yield extractor.close()
+
+
+def parse(buffer, size, encoding, with_links, base_url, matcher):
+    # Whether a profane word was found, the unique words before it and links
+    links = [] if with_links else None
+    extractor = TextExtractor(encoding, links, base_url)
+    scanner = None if matcher is None else matcher.scanner()
+    unique_words = set()
+    for words in extract_words(buffer, size, extractor):
+        if scanner is not None and scanner.feed(words):
+            return True, unique_words, links
+        unique_words.update(words)
+    return False, unique_words, links
+
+
+def parse_page(name, size, encoding, with_links, base_url, scan):
+    memory = SharedMemory(name)
+    try:
+        matcher = worker_matcher if scan else None
+        return parse(memory.buf, size, encoding, with_links, base_url, matcher)
+    finally:
+        memory.close()
+
+
+class Body:
+    # A page body in shared memory, which pool processes read without copying
+    # it through a pipe, and send back only the words and links found in it.
+    # The memory is sized from the Content-Length of the page, if any, and
+    # replaced by a larger one as needed, up to PAGE_MAX_BYTES. Bodies are made
+    # by buffer_page and abuffer_page, which take a body slot closing releases
+
+    def __init__(self, chunks=(), content_length=None):
+        head = b"".join(chunks)
+        size = max(content_length or 0, 2 * len(head))
+        self.memory = SharedMemory(create=True, size=self.capacity(size, len(head)))
+        self.size = 0
+        self.write(head)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def capacity(size, needed):
+        return max(min(size, settings.PAGE_MAX_BYTES), needed, 1)
+
+    def grow(self, needed):
+        memory = SharedMemory(
+            create=True, size=self.capacity(2 * self.memory.size, needed)
+        )
+        memory.buf[: self.size] = self.memory.buf[: self.size]
+        self.close_memory()
+        self.memory = memory
+
+    def write(self, chunk):
+        if self.size + len(chunk) > self.memory.size:
+            self.grow(self.size + len(chunk))
+        self.memory.buf[self.size : self.size + len(chunk)] = chunk
+        self.size += len(chunk)
+
+    def parse_args(self, encoding, with_links, base_url, scan):
+        return (self.memory.name, self.size, encoding, with_links, base_url, scan)
+
+    def parse(self, *args):
+        broken_pool = None
+        try:
+            broken_pool, future = submit(*self.parse_args(*args))
+            return future.result()
+        except BrokenExecutor as exception:
+            # A pool process exited, e.g. killed, the next page starts a new pool
+            discard_pool(broken_pool)
+            raise PageError("Could not parse site.") from exception
+
+    async def aparse(self, *args):
+        broken_pool = None
+        try:
+            broken_pool, future = submit(*self.parse_args(*args))
+            return await asyncio.wrap_future(future)
+        except BrokenExecutor as exception:
+            discard_pool(broken_pool)
+            raise PageError("Could not parse site.") from exception
+
+    def close_memory(self):
+        self.memory.close()
+        self.memory.unlink()
+
+    def close(self):
+        self.close_memory()
+        release_body()
+
+
+def buffer_page(chunks, content_length=None):
+    # The chunks of a page of at most PARSE_INLINE_MAX_BYTES, or else the body
+    head = []
+    size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size > settings.PARSE_INLINE_MAX_BYTES:
+            break
+    else:
+        return head, None
+    acquire_body()
+    try:
+        body = Body(head, content_length)
+    except BaseException:
+        release_body()
+        raise
+    try:
+        for chunk in chunks:
+            body.write(chunk)
+    except BaseException:
+        body.close()
+        raise
+    return None, body
+
+
+async def abuffer_page(chunks, content_length=None):
+    head = []
+    size = 0
+    async for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size > settings.PARSE_INLINE_MAX_BYTES:
+            break
+    else:
+        return head, None
+    await aacquire_body()
+    try:
+        body = Body(head, content_length)
+    except BaseException:
+        release_body()
+        raise
+    try:
+        async for chunk in chunks:
+            body.write(chunk)
+    except BaseException:
+        body.close()
+        raise
+    return None, body
@@ -0,0 +1,208 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from urllib.parse import quote, unquote
+
+from aiohttp import ClientError, ClientTimeout
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from requests.exceptions import ReadTimeout, RequestException
+from rest_framework import status
+
+from .exceptions import UpstreamError, UpstreamTimeout
+from .metrics import UPSTREAM_CHUNKS, count, count_cache
+from .sessions import get_client_session, get_session
+from .utils import split_quoted_text
+
+TIMEOUT = 20
+
+# Longest quoted text PurgoMalum accepts in one request
+MAX_CHUNK_LENGTH = 16352
+
+MIN_CHUNK_LENGTH = 1024
+
+LATENCY_WEIGHT = 0.2
+
+SUSPECT_PREFIX = "suspect:"
+
+# Exponentially weighted sums of the weight, length, seconds, length squared
+# and length times seconds of upstream requests, shared by all checks
+latency_sums = None
+
+
+def latency_model():
+    # The round trip and seconds per quoted byte of requests, fitted on their
+    # lengths and latencies, or None if there is nothing to shrink chunks for
+    if latency_sums is None:
+        return None
+    weight, length, seconds, length_squared, length_seconds = latency_sums
+    mean_length, mean_seconds = length / weight, seconds / weight
+    variance = length_squared / weight - mean_length**2
+    if variance >= MIN_CHUNK_LENGTH**2:
+        per_byte = max(
+            (length_seconds / weight - mean_length * mean_seconds) / variance, 0
+        )
+        return max(mean_seconds - per_byte * mean_length, 0), per_byte
+    # Requests of about one length cannot tell the round trip from the time
+    # per byte, they are only shortened if they take too long
+    if mean_seconds <= settings.PURGOMALUM_CHUNK_LATENCY:
+        return None
+    return 0, mean_seconds / mean_length
+
+
+def chunk_length():
+    model = latency_model()
+    if model is None:
+        return MAX_CHUNK_LENGTH
+    round_trip, per_byte = model
+    # Shorter chunks cannot make up for a slow round trip, only add requests
+    if per_byte <= 0 or round_trip >= settings.PURGOMALUM_CHUNK_LATENCY:
+        return MAX_CHUNK_LENGTH
+    length = (settings.PURGOMALUM_CHUNK_LATENCY - round_trip) / per_byte
+    return int(min(max(length, MIN_CHUNK_LENGTH), MAX_CHUNK_LENGTH))
+
+
+def observe_latency(chunk, seconds):
+    global latency_sums
+    length = len(chunk)
+    sample = (1, length, seconds, length**2, length * seconds)
+    if latency_sums is None:
+        latency_sums = sample
+    else:
+        latency_sums = tuple(
+            (1 - LATENCY_WEIGHT) * total + value
+            for total, value in zip(latency_sums, sample)
+        )
+
+
+def request_chunks(words):
+    return deque(
+        split_quoted_text(quote(" ".join(words)), chunk_length(), separator=quote(" "))
+    )
+
+
+def cache_keys(words):
+    return (*words, *(SUSPECT_PREFIX + word for word in words))
+
+
+def words_to_request(words, cached):
+    # Words of chunks found profane before go first, so that a repeated
+    # profane word is likely in the first chunk sent
+    hits = len(words)
+    words = [word for word in words if word not in cached]
+    count_cache("words", hits - len(words), len(words))
+    words.sort(key=lambda word: SUSPECT_PREFIX + word not in cached)
+    return words
+
+
+def verdicts_to_cache(chunk, verdict):
+    words = unquote(chunk).split()
+    if verdict is False:
+        return dict.fromkeys(words, False)
+    if len(words) == 1:
+        return {words[0]: True}
+    return {SUSPECT_PREFIX + word: True for word in words}
+
+
+def status_error(status_code):
+    return UpstreamError(
+        f"Request to third-party API failed with status code {status_code}."
+    )
+
+
+def check_verdict(verdict):
+    # Anything but a boolean would be cached as profane yet not reported so
+    if not isinstance(verdict, bool):
+        raise UpstreamError("Third-party API returned an invalid verdict.")
+    return verdict
+
+
+def contains_profanity(words):
+    word_cache = caches["words"]
+    cached = word_cache.get_many(cache_keys(words))
+    if any(cached.get(word) for word in words):
+        return True
+    words = words_to_request(words, cached)
+    if not words:
+        return False
+    session = get_session()
+    chunks = request_chunks(words)
+    futures = {}
+    try:
+        while chunks or futures:
+            while chunks and len(futures) < settings.PURGOMALUM_CHUNKS_PER_CHECK:
+                chunk = chunks.popleft()
+                futures[
+                    session.get(settings.PURGOMALUM_URL + chunk, timeout=TIMEOUT)
+                ] = chunk
+                count(UPSTREAM_CHUNKS)
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = futures.pop(future)
+                try:
+                    response = future.result()
+                    if response.status_code != status.HTTP_200_OK:
+                        raise status_error(response.status_code)
+                    verdict = check_verdict(response.json())
+                except ReadTimeout as exception:
+                    raise UpstreamTimeout() from exception
+                # Failing to connect, or a response that is not JSON
+                except (RequestException, ValueError) as exception:
+                    raise UpstreamError() from exception
+                observe_latency(chunk, response.elapsed.total_seconds())
+                word_cache.set_many(verdicts_to_cache(chunk, verdict))
+                if verdict is True:
+                    return True
+        return False
+    finally:
+        # Chunks still queued are dropped, those being sent finish unread
+        for future in futures:
+            future.cancel()
+
+
+async def request_verdict(session, chunk):
+    start = time.perf_counter()
+    try:
+        async with session.get(
+            settings.PURGOMALUM_URL + chunk, timeout=ClientTimeout(total=TIMEOUT)
+        ) as response:
+            if response.status != status.HTTP_200_OK:
+                raise status_error(response.status)
+            verdict = check_verdict(await response.json(content_type=None))
+    except asyncio.TimeoutError as exception:
+        raise UpstreamTimeout() from exception
+    except (ClientError, ValueError) as exception:
+        raise UpstreamError() from exception
+    observe_latency(chunk, time.perf_counter() - start)
+    # The cache's own async methods make one thread hop per key
+    await sync_to_async(caches["words"].set_many)(verdicts_to_cache(chunk, verdict))
+    return verdict
+
+
+async def acontains_profanity(words):
+    cached = await sync_to_async(caches["words"].get_many)(cache_keys(words))
+    if any(cached.get(word) for word in words):
+        return True
+    words = words_to_request(words, cached)
+    if not words:
+        return False
+    session = get_client_session()
+    chunks = request_chunks(words)
+    tasks = set()
+    try:
+        while chunks or tasks:
+            while chunks and len(tasks) < settings.PURGOMALUM_CHUNKS_PER_CHECK:
+                tasks.add(
+                    asyncio.create_task(request_verdict(session, chunks.popleft()))
+                )
+                count(UPSTREAM_CHUNKS)
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.result() is True:
+                    return True
+        return False
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db.models import Aggregate
+from django.utils import timezone
+
+from .models import Site
+
+EXAMPLES_CACHE_KEY = "schema:examples"
+
+# Query parameters of /v1/sites whose examples are the median of a Site field
+DATETIME_EXAMPLES = {
+    "last_check_after": Site.last_check_time.field.name,
+    "last_status_update_after": Site.last_status_update_time.field.name,
+}
+
+
+class PercentileDisc(Aggregate):
+    function = "percentile_disc"
+    template = "%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=percentile, **extra)
+
+
+def median_datetimes():
+    try:
+        medians = Site.objects.aggregate(
+            **{
+                field: PercentileDisc(field, percentile=0.5)
+                for field in DATETIME_EXAMPLES.values()
+            }
+        )
+    except DatabaseError:
+        medians = {}
+    return {
+        param: timezone.localtime(medians.get(field) or timezone.now())
+        for param, field in DATETIME_EXAMPLES.items()
+    }
+
+
+def add_datetime_examples(result, generator, request, public):
+    examples = cache.get_or_set(
+        EXAMPLES_CACHE_KEY, median_datetimes, settings.SCHEMA_EXAMPLES_TIMEOUT
+    )
+    for path in result["paths"].values():
+        for operation in path.values():
+            for parameter in operation.get("parameters", ()):
+                if parameter["name"] in examples:
+                    parameter["examples"]["ExampleParameterValue"]["value"] = examples[
+                        parameter["name"]
+                    ]
+    return result
@@ -1,9 +1,25 @@
 from rest_framework import serializers
 
-from .models import Site
+from .models import Domain, Job, Site
 
 
 class SiteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Site
+        exclude = (
+            Site.url_hash.field.name,
+            Site.recheck_claimed_time.field.name,
+            *Site.CONDITIONAL_FIELDS,
+        )
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        exclude = ("claimed_time",)
+
+
+class DomainSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Domain
         fields = "__all__"
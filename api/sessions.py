@@ -0,0 +1,70 @@
+import asyncio
+import atexit
+import os
+import threading
+from weakref import WeakKeyDictionary
+
+from aiohttp import ClientSession, TCPConnector
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from requests_futures.sessions import FuturesSession
+
+session = None
+session_lock = threading.Lock()
+client_sessions = WeakKeyDictionary()
+
+
+def get_session():
+    global session
+    if session is None:
+        with session_lock:
+            if session is None:
+                new_session = FuturesSession(max_workers=settings.PURGOMALUM_WORKERS)
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.PURGOMALUM_POOL_SIZE,
+                    pool_block=True,
+                )
+                new_session.mount("https://", adapter)
+                new_session.mount("http://", adapter)
+                session = new_session
+    return session
+
+
+def close_session():
+    global session
+    with session_lock:
+        if session is not None:
+            session.close()
+            session = None
+
+
+def reset_session():
+    global session, session_lock
+    session = None
+    session_lock = threading.Lock()
+
+
+atexit.register(close_session)
+os.register_at_fork(after_in_child=reset_session)
+
+
+def get_client_session(auto_decompress=True):
+    # Pages are read from a session of their own, which leaves decompressing
+    # them to the reader
+    loop = asyncio.get_running_loop()
+    loop_sessions = client_sessions.setdefault(loop, {})
+    client_session = loop_sessions.get(auto_decompress)
+    if client_session is None or client_session.closed:
+        client_session = ClientSession(
+            connector=TCPConnector(limit=0, ttl_dns_cache=settings.FETCH_DNS_TTL),
+            auto_decompress=auto_decompress,
+        )
+        loop_sessions[auto_decompress] = client_session
+    return client_session
+
+
+async def close_client_session():
+    loop_sessions = client_sessions.pop(asyncio.get_running_loop(), {})
+    for client_session in loop_sessions.values():
+        await client_session.close()
@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from urllib.parse import urlsplit, urlunsplit
+from weakref import WeakKeyDictionary
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .checker import acheck_site, check_site
+from .listing import get_listed_site
+from .metrics import stage
+from .models import Site
+from .writer import awrite_result, write_result
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+POLL_INTERVAL = 0.05
+
+# Long enough for processes polling the lock to read the result once it goes
+RESULT_TIMEOUT = 5
+
+in_flight = {}
+in_flight_lock = threading.Lock()
+async_in_flight = WeakKeyDictionary()
+
+
+def normalize_url(url):
+    # URLField accepts ports out of range, which urllib cannot parse
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError as exception:
+        raise ValidationError("Invalid URL.") from exception
+    scheme = parts.scheme.lower()
+    host = parts.hostname or ""
+    if ":" in host:
+        host = f"[{host}]"
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host += f":{port}"
+    if parts.username is not None:
+        host = parts.netloc.rpartition("@")[0] + "@" + host
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+def flight_keys(url):
+    digest = hashlib.sha256(normalize_url(url).encode()).hexdigest()
+    return f"check:{digest}:lock", f"check:{digest}:result"
+
+
+def age_of(site):
+    return (timezone.now() - site["last_check_time"]).total_seconds()
+
+
+def stored_result(url, max_age):
+    # The stored verdict and its age in seconds, if checked at most max_age ago
+    if max_age <= 0:
+        return None
+    with stage("listing"):
+        site = get_listed_site(url)
+    # Listed sites are only trusted when recent enough, the table may have a
+    # check the listing does not yet
+    if site is None or age_of(site) > max_age:
+        with stage("db"):
+            site = (
+                Site.objects.by_url(url)
+                .values("contains_profanity", "last_check_time")
+                .first()
+            )
+    if site is None:
+        return None
+    age = age_of(site)
+    if age > max_age:
+        return None
+    return site["contains_profanity"], max(int(age), 0)
+
+
+astored_result = sync_to_async(stored_result)
+
+
+def check_and_save(url):
+    with stage("db"):
+        site = Site.objects.by_url(url).first()
+    result = check_site(url, site)
+    with stage("save"):
+        write_result(url, result)
+    return url, result
+
+
+async def acheck_and_save(url):
+    with stage("db"):
+        site = await Site.objects.by_url(url).afirst()
+    result = await acheck_site(url, site)
+    with stage("save"):
+        await awrite_result(url, result)
+    return url, result
+
+
+def check_across_processes(url):
+    lock_key, result_key = flight_keys(url)
+    if cache.add(lock_key, True, settings.SINGLE_FLIGHT_TIMEOUT):
+        try:
+            checked = check_and_save(url)
+            cache.set(result_key, checked, RESULT_TIMEOUT)
+            return checked
+        finally:
+            cache.delete(lock_key)
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_TIMEOUT
+    while time.monotonic() < deadline and cache.get(lock_key) is not None:
+        time.sleep(POLL_INTERVAL)
+    checked = cache.get(result_key)
+    # Without a result the other check failed or timed out
+    return check_and_save(url) if checked is None else checked
+
+
+async def acheck_across_processes(url):
+    lock_key, result_key = flight_keys(url)
+    if await cache.aadd(lock_key, True, settings.SINGLE_FLIGHT_TIMEOUT):
+        try:
+            checked = await acheck_and_save(url)
+            await cache.aset(result_key, checked, RESULT_TIMEOUT)
+            return checked
+        finally:
+            await cache.adelete(lock_key)
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_TIMEOUT
+    while time.monotonic() < deadline and await cache.aget(lock_key) is not None:
+        await asyncio.sleep(POLL_INTERVAL)
+    checked = await cache.aget(result_key)
+    return await acheck_and_save(url) if checked is None else checked
+
+
+def check_site_once(url):
+    key = normalize_url(url)
+    with in_flight_lock:
+        future = in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = in_flight[key] = Future()
+    if leader:
+        try:
+            future.set_result(check_across_processes(url))
+        except Exception as exception:
+            future.set_exception(exception)
+        finally:
+            with in_flight_lock:
+                del in_flight[key]
+    try:
+        checked_url, result = future.result(settings.SINGLE_FLIGHT_TIMEOUT)
+    except FutureTimeoutError:
+        # Callers give up waiting for a check as they do across processes
+        checked_url, result = check_and_save(url)
+    # Results are shared between spellings of a URL but stored for each
+    if checked_url != url:
+        write_result(url, result)
+    return result
+
+
+async def acheck_site_once(url):
+    key = normalize_url(url)
+    flights = async_in_flight.setdefault(asyncio.get_running_loop(), {})
+    future = flights.get(key)
+    if future is None:
+        future = flights[key] = asyncio.get_running_loop().create_future()
+        # Retrieves the exception so that unshared failures are not logged
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        try:
+            future.set_result(await acheck_across_processes(url))
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exception:
+            future.set_exception(exception)
+        finally:
+            del flights[key]
+    try:
+        checked_url, result = await asyncio.wait_for(
+            asyncio.shield(future), settings.SINGLE_FLIGHT_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        checked_url, result = await acheck_and_save(url)
+    if checked_url != url:
+        await awrite_result(url, result)
+    return result
@@ -0,0 +1,30 @@
+import fakeredis
+from django_redis import get_redis_connection
+
+server = fakeredis.FakeServer()
+
+
+def fake_cache(**options):
+    return {
+        "BACKEND": "django_redis.cache.RedisCache",
+        # Connection pools are kept per location, which no Redis server has
+        "LOCATION": "redis://fakeredis/0",
+        "OPTIONS": {
+            "CONNECTION_POOL_KWARGS": {
+                "connection_class": fakeredis.FakeConnection,
+                "server": server,
+            },
+        },
+        **options,
+    }
+
+
+# CACHES with both caches in one in-memory Redis, for override_settings
+CACHES = {
+    "default": fake_cache(TIMEOUT=None),
+    "words": fake_cache(KEY_PREFIX="word"),
+}
+
+
+def flush_redis():
+    get_redis_connection().flushall()
@@ -0,0 +1,55 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        self.server.requests.append((path, self.headers))
+        page = self.server.pages.get(path, (404, {}, b""))
+        if callable(page):
+            page = page(self)
+        if not isinstance(page, tuple):
+            page = (200, {"Content-Type": "text/html; charset=utf-8"}, page)
+        status, headers, body = page
+        body = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PageServer:
+    # Serves pages on a local port from a dict of paths to bodies, to
+    # (status, headers, body), or to functions of the request returning either,
+    # and records the path and headers of each request
+
+    def __init__(self, pages):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+        self.server.daemon_threads = True
+        self.server.pages = pages
+        self.server.requests = []
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    def paths(self):
+        return [path for path, _ in self.requests]
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,29 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from api.bulk import check, check_sites
+from api.exceptions import PageError
+
+
+class CheckSitesTests(TestCase):
+    @patch("api.bulk.check_site", side_effect=PageError())
+    def test_invalid_urls(self, check_site):
+        results = list(check_sites(("http://[bad", "https://example.com/")))
+        self.assertEqual(
+            results,
+            [
+                dict(url="http://[bad", status=400, detail="Enter a valid URL."),
+                dict(
+                    url="https://example.com/",
+                    status=502,
+                    detail="Could not fetch site.",
+                ),
+            ],
+        )
+        check_site.assert_called_once()
+
+    @patch("api.bulk.check_site", side_effect=RuntimeError("bug"))
+    def test_unexpected_errors_propagate(self, check_site):
+        with self.assertRaises(RuntimeError):
+            check("https://example.com/", None)
@@ -0,0 +1,204 @@
+import asyncio
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from api.checker import PageCheck, Result, acheck_site, check_site, save_results
+from api.extraction import TextExtractor
+from api.models import Site
+from api.sessions import close_client_session
+from api.tests.fake_redis import CACHES, flush_redis
+from api.tests.pages import PageServer
+
+URL = "https://example.com/"
+
+
+@override_settings(CACHES=CACHES)
+class SaveResultsTests(TestCase):
+    def setUp(self):
+        flush_redis()
+        self.checked = timezone.now() - timedelta(hours=1)
+        save_results({URL: Result(False, etag='"a"', check_time=self.checked)})
+
+    def test_inserts(self):
+        site = Site.objects.get(url=URL)
+        self.assertEqual(site.contains_profanity, False)
+        self.assertEqual(site.etag, '"a"')
+        self.assertEqual(site.last_check_time, self.checked)
+        self.assertEqual(site.last_status_update_time, self.checked)
+
+    def test_keeps_status_update_time_of_same_verdict(self):
+        now = timezone.now()
+        save_results({URL: Result(False, etag='"b"', check_time=now)})
+        site = Site.objects.get(url=URL)
+        self.assertEqual(site.etag, '"b"')
+        self.assertEqual(site.last_check_time, now)
+        self.assertEqual(site.last_status_update_time, self.checked)
+
+    def test_updates_status_update_time_of_new_verdict(self):
+        now = timezone.now()
+        save_results({URL: Result(True, check_time=now)})
+        site = Site.objects.get(url=URL)
+        self.assertEqual(site.contains_profanity, True)
+        self.assertEqual(site.last_status_update_time, now)
+
+    def test_drops_older_results(self):
+        save_results({URL: Result(True, check_time=self.checked - timedelta(1))})
+        site = Site.objects.get(url=URL)
+        self.assertEqual(site.contains_profanity, False)
+        self.assertEqual(site.last_check_time, self.checked)
+
+
+async def acheck(url, site=None):
+    try:
+        return await acheck_site(url, site), threading.get_ident()
+    finally:
+        await close_client_session()
+
+
+@override_settings(CACHES=CACHES, PROFANITY_BACKEND="local", PAGE_CHUNK_SIZE=4096)
+class AsyncParseTests(SimpleTestCase):
+    def test_parses_off_event_loop(self):
+        threads = set()
+        feed_bytes = TextExtractor.feed_bytes
+
+        def record_thread(extractor, chunk):
+            threads.add(threading.get_ident())
+            return feed_bytes(extractor, chunk)
+
+        page = "<p>" + "clean words " * 10_000 + "</p>"
+        for processes in (0, 1):
+            with self.subTest(processes=processes), self.settings(
+                PARSE_PROCESSES=processes
+            ), PageServer({"/": page}) as server, patch.object(
+                TextExtractor, "feed_bytes", record_thread
+            ):
+                threads.clear()
+                result, loop_thread = asyncio.run(acheck(server.url + "/"))
+                self.assertFalse(result.contains_profanity)
+                self.assertTrue(threads)
+                self.assertNotIn(loop_thread, threads)
+
+
+# Words profane to the stubbed PurgoMalum, and to the word list
+UPSTREAM_WORDS = {"heck", "bitch"}
+PAGES = {
+    "/clean": "<p>A clean page</p>",
+    "/local": "<p>A clean page, you bitch</p>",
+    "/upstream": "<p>A clean page, what the heck</p>",
+}
+
+
+def purgomalum(request):
+    words = parse_qs(urlsplit(request.path).query)["text"][0].split()
+    return (200, {}, "true" if UPSTREAM_WORDS.intersection(words) else "false")
+
+
+def conditional_page(request):
+    # Unchanged for requests with the ETag of the page
+    headers = {"ETag": '"1"', "Content-Type": "text/html"}
+    if request.headers.get("If-None-Match") == '"1"':
+        return (304, headers, b"")
+    return (200, headers, PAGES["/upstream"])
+
+
+def sync_and_async_checks():
+    yield "sync", check_site
+    yield "async", lambda url, site=None: asyncio.run(acheck(url, site))[0]
+
+
+@override_settings(CACHES=CACHES)
+class StubbedSitesTestCase(SimpleTestCase):
+    # Sites and PurgoMalum are served by a local server
+    def setUp(self):
+        flush_redis()
+        pages = {**PAGES, "/conditional": conditional_page, "/purgomalum": purgomalum}
+        self.server = PageServer(pages).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        settings = self.settings(PURGOMALUM_URL=self.server.url + "/purgomalum?text=")
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class BackendTests(StubbedSitesTestCase):
+    def check(self, path, backend):
+        # Verdicts of the sync and async checks, and whether either asked
+        # PurgoMalum, whose verdicts are cached in between
+        with self.settings(PROFANITY_BACKEND=backend):
+            verdicts = []
+            for _, check in sync_and_async_checks():
+                flush_redis()
+                verdicts.append(check(self.server.url + path).contains_profanity)
+        self.assertEqual(verdicts[0], verdicts[1])
+        return verdicts[0], "/purgomalum" in self.server.paths()
+
+    def test_local(self):
+        self.assertEqual(self.check("/clean", "local"), (False, False))
+        self.assertEqual(self.check("/local", "local"), (True, False))
+        self.assertEqual(self.check("/upstream", "local"), (False, False))
+
+    def test_remote(self):
+        self.assertEqual(self.check("/local", "remote"), (True, True))
+        self.server.requests.clear()
+        self.assertEqual(self.check("/upstream", "remote"), (True, True))
+        self.server.requests.clear()
+        self.assertEqual(self.check("/clean", "remote"), (False, True))
+
+    def test_crosscheck(self):
+        # Words in the word list are not sent upstream
+        self.assertEqual(self.check("/local", "crosscheck"), (True, False))
+        self.assertEqual(self.check("/upstream", "crosscheck"), (True, True))
+        self.server.requests.clear()
+        self.assertEqual(self.check("/clean", "crosscheck"), (False, True))
+
+
+@override_settings(PROFANITY_BACKEND="remote")
+class ConditionalCheckTests(StubbedSitesTestCase):
+    def test_unchanged_page(self):
+        site = Site(
+            url=self.server.url + "/conditional",
+            contains_profanity=False,
+            etag='"1"',
+            last_modified="Mon, 02 Jan 2023 00:00:00 GMT",
+            fingerprint="0" * 64,
+        )
+        expected = Result.unchanged(site)
+        for name, check in sync_and_async_checks():
+            with self.subTest(name), patch.object(
+                PageCheck, "read", side_effect=AssertionError
+            ), patch.object(PageCheck, "aread", side_effect=AssertionError):
+                self.server.requests.clear()
+                result = check(site.url, site)
+                self.assertEqual(result.contains_profanity, False)
+                self.assertEqual(
+                    (result.etag, result.last_modified, result.fingerprint),
+                    (expected.etag, expected.last_modified, expected.fingerprint),
+                )
+                [(_, headers)] = self.server.requests
+                self.assertEqual(headers["If-None-Match"], '"1"')
+                self.assertEqual(headers["If-Modified-Since"], site.last_modified)
+
+    def test_same_fingerprint_skips_upstream(self):
+        url = self.server.url + "/upstream"
+        fingerprint = check_site(url).fingerprint
+        # The stored verdict differs from PurgoMalum's, so is the one reused
+        site = Site(url=url, contains_profanity=False, fingerprint=fingerprint)
+        for name, check in sync_and_async_checks():
+            with self.subTest(name):
+                flush_redis()
+                self.server.requests.clear()
+                result = check(url, site)
+                self.assertEqual(result.contains_profanity, False)
+                self.assertEqual(result.fingerprint, fingerprint)
+                self.assertEqual(self.server.paths(), ["/upstream"])
+        site.fingerprint = "0" * 64
+        for name, check in sync_and_async_checks():
+            with self.subTest(name, fingerprint="changed"):
+                flush_redis()
+                self.server.requests.clear()
+                self.assertTrue(check(url, site).contains_profanity)
+                self.assertIn("/purgomalum", self.server.paths())
@@ -0,0 +1,83 @@
+from concurrent.futures import ALL_COMPLETED
+from concurrent.futures import wait as wait_futures
+from unittest.mock import patch
+
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.checker import Result
+from api.crawl import crawl, crawlable, origin
+from api.models import Domain
+from api.serializers import DomainSerializer
+from api.tests.fake_redis import CACHES, flush_redis
+
+PAGES = {
+    "https://example.com/": ["https://example.com/a", "https://example.com/b"],
+    "https://example.com/a": [],
+    "https://example.com/b": [],
+}
+
+
+class OriginTests(SimpleTestCase):
+    def test_origin(self):
+        self.assertEqual(
+            origin("HTTPS://user@Example.com:443/a?b"), "https://example.com"
+        )
+
+    def test_invalid_port(self):
+        with self.assertRaises(ValidationError):
+            origin("http://example.com:99999/")
+
+    def test_crawlable(self):
+        root_origin = origin("https://example.com/")
+        self.assertTrue(crawlable("https://example.com/a", root_origin))
+        self.assertFalse(crawlable("https://example.org/a", root_origin))
+        self.assertFalse(crawlable("https://example.com/a.png", root_origin))
+        self.assertFalse(crawlable("https://example.com:99999/a", root_origin))
+
+
+def check_page(url, profane=()):
+    if url not in PAGES:
+        return url, dict(status=502, detail="Could not fetch site."), []
+    return url, Result(url in profane), PAGES[url]
+
+
+def wait_all(futures, timeout, return_when):
+    # Every page in flight finishes together
+    return wait_futures(futures, return_when=ALL_COMPLETED)
+
+
+@override_settings(CACHES=CACHES, CRAWL_CONCURRENCY=2, CRAWL_DELAY=0)
+@patch("api.crawl.wait", wait_all)
+class CrawlTests(TestCase):
+    def setUp(self):
+        flush_redis()
+
+    def crawl(self, url, stop_on_hit=False, profane=()):
+        with patch("api.crawl.check_page", lambda url: check_page(url, profane)):
+            *pages, rollup = crawl(url, 1, 10, stop_on_hit)
+        self.assertEqual(rollup, DomainSerializer(Domain.objects.get()).data)
+        return pages, rollup
+
+    def test_crawls(self):
+        pages, rollup = self.crawl("https://example.com/")
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(rollup["pages_checked"], 3)
+        self.assertTrue(rollup["complete"])
+        self.assertFalse(rollup["contains_profanity"])
+
+    def test_failed_root(self):
+        pages, rollup = self.crawl("https://example.com/missing")
+        self.assertEqual(pages[0]["status"], 502)
+        self.assertEqual(rollup["pages_checked"], 0)
+        self.assertEqual(rollup["failed_pages"], 1)
+        self.assertFalse(rollup["complete"])
+
+    def test_stop_on_hit_reports_finished_pages(self):
+        pages, rollup = self.crawl(
+            "https://example.com/", True, ("https://example.com/a",)
+        )
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(rollup["pages_checked"], 3)
+        self.assertEqual(rollup["profane_pages"], 1)
+        self.assertTrue(rollup["contains_profanity"])
@@ -0,0 +1,54 @@
+from django.test import TestCase, override_settings
+from ujson import loads
+
+from api.export import export
+from api.models import Site
+from api.serializers import SiteSerializer
+from api.tests.fake_redis import CACHES, flush_redis
+
+CHUNK_SIZE = 3
+
+SITES_URL = "/api/v1/sites"
+
+
+@override_settings(CACHES=CACHES, SITES_EXPORT_CHUNK_SIZE=CHUNK_SIZE)
+class ExportTests(TestCase):
+    def setUp(self):
+        flush_redis()
+
+    def create_sites(self, count):
+        for index in range(count):
+            Site.objects.create(
+                url=f"https://example.com/{index}", contains_profanity=index % 2 == 1
+            )
+        return SiteSerializer(Site.objects.order_by("url"), many=True).data
+
+    def export(self, export_format):
+        return b"".join(export(Site.objects.order_by("url"), export_format))
+
+    def test_ndjson(self):
+        for count in (0, 1, CHUNK_SIZE, CHUNK_SIZE + 1, 2 * CHUNK_SIZE + 1):
+            with self.subTest(count=count):
+                Site.objects.all().delete()
+                sites = self.create_sites(count)
+                data = self.export("ndjson")
+                self.assertEqual(data.count(b"\n"), count)
+                self.assertTrue(not data or data.endswith(b"\n"))
+                self.assertEqual([loads(line) for line in data.splitlines()], sites)
+
+    def test_json(self):
+        for count in (0, 1, CHUNK_SIZE, CHUNK_SIZE + 1, 2 * CHUNK_SIZE + 1):
+            with self.subTest(count=count):
+                Site.objects.all().delete()
+                sites = self.create_sites(count)
+                self.assertEqual(loads(self.export("json")), sites)
+
+    def test_view(self):
+        sites = self.create_sites(CHUNK_SIZE + 1)
+        response = self.client.get(SITES_URL, {"export": "ndjson"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertCountEqual([loads(line) for line in lines], sites)
+        response = self.client.get(SITES_URL, {"export": "json"})
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertCountEqual(loads(b"".join(response.streaming_content)), sites)
@@ -0,0 +1,107 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from api import parsing
+from api.checker import PageCheck
+from api.extraction import TextExtractor
+from api.matcher import get_matcher
+
+feed_bytes = TextExtractor.feed_bytes
+
+
+def extract(chunks, encoding="utf-8", links=None):
+    extractor = TextExtractor(encoding, links, "https://example.com/a/")
+    words = [word for chunk in chunks for word in extractor.feed_bytes(chunk)]
+    return words + extractor.close()
+
+
+def split(data, *positions):
+    bounds = (0, *positions, len(data))
+    return [data[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+class TextExtractorTests(SimpleTestCase):
+    def test_words_split_across_chunks(self):
+        html = b"<p>Hello wonderful world</p><p>again</p>"
+        expected = ["hello", "wonderful", "world", "again"]
+        for position in range(1, len(html)):
+            with self.subTest(position=position):
+                self.assertEqual(extract(split(html, position)), expected)
+        self.assertEqual(extract(html[i : i + 1] for i in range(len(html))), expected)
+
+    def test_characters_split_across_chunks(self):
+        html = "<p>Grüße aus Köln, ＦＵＬＬ</p>".encode()
+        expected = ["grüsse", "aus", "köln", "full"]
+        for position in range(1, len(html)):
+            with self.subTest(position=position):
+                self.assertEqual(extract(split(html, position)), expected)
+        html = "<p>Grüße</p>".encode("utf-16-le")
+        self.assertEqual(extract(split(html, 7), "utf-16-le"), ["grüsse"])
+
+    def test_ignored_tags(self):
+        html = (
+            b"<p>shown</p><script>var hidden = '<p>';</script>"
+            b"<style>p { hidden: 1 }</style><template><p>hidden</p></template>"
+            b"<p>also shown</p>"
+        )
+        for position in (20, 40, 100):
+            with self.subTest(position=position):
+                self.assertEqual(
+                    extract(split(html, position)), ["shown", "also", "shown"]
+                )
+
+    def test_words_around_tags_and_comments(self):
+        html = b"<p>one<b>two</b>three<!-- four -->five</p>"
+        self.assertEqual(extract(split(html, 5, 17)), ["one", "two", "three", "five"])
+
+    def test_links(self):
+        links = []
+        html = (
+            b'<a href="b">b</a><base href="/c/"><a href="d#top">d</a>'
+            b'<area href="https://example.org/"><a>no link</a>'
+        )
+        extract(split(html, 10, 30), links=links)
+        self.assertEqual(
+            links,
+            [
+                "https://example.com/a/b",
+                "https://example.com/c/d",
+                "https://example.org/",
+            ],
+        )
+
+
+@override_settings(PROFANITY_BACKEND="local")
+class StopAtProfanityTests(SimpleTestCase):
+    def test_page_check_stops_reading(self):
+        read = []
+
+        def chunks():
+            for chunk in (b"<p>clean ", b"words, bit", b"ch</p>", b"<p>more</p>"):
+                read.append(chunk)
+                yield chunk
+
+        page = PageCheck({})
+        extractor = TextExtractor()
+        self.assertTrue(page.feed_chunks(chunks(), extractor))
+        # The word continues in the third chunk, the fourth is never read
+        self.assertEqual(len(read), 3)
+        self.assertEqual(page.unique_words, {"clean", "words"})
+
+    def test_parse_stops_reading(self):
+        # The word is in the second chunk of three
+        html = (
+            b"<p>clean words</p>".ljust(parsing.CHUNK_SIZE)
+            + b"<p>bitch</p>"
+            + b"<p>later</p>" * (parsing.CHUNK_SIZE // 10)
+        )
+        with patch.object(
+            TextExtractor, "feed_bytes", autospec=True, side_effect=feed_bytes
+        ) as feed:
+            contains_profanity, unique_words, _ = parsing.parse(
+                memoryview(html), len(html), "utf-8", False, "", get_matcher()
+            )
+        self.assertTrue(contains_profanity)
+        self.assertEqual(unique_words, {"clean", "words"})
+        self.assertEqual(feed.call_count, 2)
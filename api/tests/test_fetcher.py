@@ -0,0 +1,57 @@
+import gzip
+import zlib
+
+import brotli
+from django.test import SimpleTestCase
+from urllib3.exceptions import DecodeError
+
+from api.fetcher import Decompressor
+
+BODY = b"<p>" + b"clean words " * 100_000 + b"</p>"
+LIMIT = 64 * 1024
+
+
+def decompress(encoding, data, limit=LIMIT):
+    decompressor = Decompressor(encoding, limit)
+    # Fed in small reads, as bodies are streamed
+    return [
+        chunk
+        for start in range(0, len(data), 100)
+        for chunk in decompressor.decompress(data[start : start + 100])
+    ]
+
+
+class DecompressorTests(SimpleTestCase):
+    def test_encodings(self):
+        raw_deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        bodies = {
+            "gzip": gzip.compress(BODY),
+            "deflate": zlib.compress(BODY),
+            "br": brotli.compress(BODY),
+            "identity": BODY,
+        }
+        bodies_without_header = {
+            "deflate": raw_deflate.compress(BODY) + raw_deflate.flush(),
+            "gzip": gzip.compress(BODY[:1000]) + gzip.compress(BODY[1000:]),
+        }
+        for bodies_ in (bodies, bodies_without_header):
+            for encoding, data in bodies_.items():
+                with self.subTest(encoding):
+                    self.assertEqual(b"".join(decompress(encoding, data)), BODY)
+
+    def test_bounds_output(self):
+        bomb = b"a " * (16 * 1024 * 1024)
+        for encoding, data in (
+            ("gzip", gzip.compress(bomb)),
+            ("br", brotli.compress(bomb, quality=5)),
+        ):
+            with self.subTest(encoding):
+                decompressor = Decompressor(encoding, LIMIT)
+                chunks = decompressor.decompress(data[:1000])
+                # Brotli bounds its output buffer only about the limit
+                self.assertLessEqual(len(next(chunks)), 2 * LIMIT)
+                chunks.close()
+
+    def test_invalid(self):
+        with self.assertRaises(DecodeError):
+            decompress("gzip", b"not gzip")
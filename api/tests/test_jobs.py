@@ -0,0 +1,78 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api import jobs
+from api.jobs import claim, purge, run
+from api.models import Job
+
+
+@override_settings(JOB_LEASE_TIMEOUT=60)
+class JobTests(TestCase):
+    def test_claims_queued_jobs(self):
+        job = Job.objects.create(url="https://example.com/")
+        self.assertEqual(claim(), job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.RUNNING)
+        self.assertIsNotNone(job.claimed_time)
+        self.assertIsNone(claim())
+
+    def test_claims_expired_jobs(self):
+        now = timezone.now()
+        Job.objects.create(
+            url="https://example.com/",
+            status=Job.Status.RUNNING,
+            claimed_time=now - timedelta(seconds=30),
+        )
+        expired = Job.objects.create(
+            url="https://example.com/",
+            status=Job.Status.RUNNING,
+            claimed_time=now - timedelta(seconds=90),
+        )
+        self.assertEqual(claim(), expired)
+        self.assertIsNone(claim())
+
+    @patch("api.jobs.check", side_effect=DatabaseError("connection lost"))
+    def test_fails_jobs(self, check):
+        job = Job.objects.create(url="https://example.com/")
+        with self.assertRaises(DatabaseError):
+            run(claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.status_code, 500)
+        self.assertEqual(job.detail, "Could not run job.")
+
+
+@override_settings(JOB_RETENTION=3600)
+class PurgeTests(TestCase):
+    def create_job(self, status, finished_ago=None):
+        finished_time = None
+        if finished_ago is not None:
+            finished_time = timezone.now() - timedelta(seconds=finished_ago)
+        return Job.objects.create(
+            url="https://example.com/", status=status, finished_time=finished_time
+        )
+
+    @patch.object(jobs, "PURGE_BATCH_SIZE", 2)
+    def test_purges_expired_finished_jobs(self):
+        for _ in range(3):
+            self.create_job(Job.Status.DONE, 7200)
+        self.create_job(Job.Status.FAILED, 7200)
+        kept = {
+            self.create_job(Job.Status.DONE, 60).id,
+            self.create_job(Job.Status.FAILED, 60).id,
+            self.create_job(Job.Status.QUEUED).id,
+            self.create_job(Job.Status.RUNNING).id,
+        }
+        self.assertEqual(purge(), 4)
+        self.assertEqual(set(Job.objects.values_list("id", flat=True)), kept)
+        self.assertEqual(purge(), 0)
+
+    @override_settings(JOB_RETENTION=0)
+    def test_keeps_jobs_without_retention(self):
+        self.create_job(Job.Status.DONE, 7200)
+        self.assertEqual(purge(), 0)
+        self.assertEqual(Job.objects.count(), 1)
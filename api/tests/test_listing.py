@@ -0,0 +1,97 @@
+import threading
+from unittest import mock
+
+from django.test import TransactionTestCase, override_settings
+from django_redis import get_redis_connection
+from ujson import loads
+
+from api import listing
+from api.listing import get_listing, listing_key, update_listings
+from api.models import Site
+from api.tests.fake_redis import CACHES, flush_redis
+
+serialize = listing.serialize
+
+
+def listed(contains_profanity):
+    return {site["url"]: site for site in loads(get_listing(contains_profanity))}
+
+
+@override_settings(CACHES=CACHES)
+class ListingTests(TransactionTestCase):
+    def setUp(self):
+        flush_redis()
+        self.clean = Site.objects.create(
+            url="https://clean.example/", contains_profanity=False
+        )
+        self.profane = Site.objects.create(
+            url="https://profane.example/", contains_profanity=True
+        )
+
+    def build_while_saving(self, contains_profanity, site):
+        # Saves site once the build has read its snapshot of the table
+        def save_once(listed_site):
+            if not saved.is_set():
+                saved.set()
+                site.save()
+                update_listings([site])
+            return serialize(listed_site)
+
+        saved = threading.Event()
+        with mock.patch.object(listing, "serialize", side_effect=save_once):
+            return listed(contains_profanity)
+
+    def test_builds_listings(self):
+        self.assertEqual(listed(None).keys(), {self.clean.url, self.profane.url})
+        self.assertEqual(listed(True).keys(), {self.profane.url})
+        self.assertEqual(listed(False).keys(), {self.clean.url})
+        self.assertGreater(get_redis_connection().ttl(listing_key(None)), 0)
+
+    def test_updates_built_listings(self):
+        for contains_profanity in (None, True, False):
+            listed(contains_profanity)
+        self.clean.contains_profanity = True
+        self.clean.save()
+        update_listings([self.clean])
+        self.assertTrue(listed(None)[self.clean.url]["contains_profanity"])
+        self.assertIn(self.clean.url, listed(True))
+        self.assertNotIn(self.clean.url, listed(False))
+
+    def test_keeps_sites_saved_while_building(self):
+        self.clean.contains_profanity = True
+        sites = self.build_while_saving(None, self.clean)
+        self.assertTrue(sites[self.clean.url]["contains_profanity"])
+
+    def test_drops_sites_moved_out_while_building(self):
+        self.clean.contains_profanity = True
+        self.assertEqual(self.build_while_saving(False, self.clean).keys(), set())
+        self.assertEqual(listed(True).keys(), {self.clean.url, self.profane.url})
+
+    def test_concurrent_builds(self):
+        def slow_serialize(site):
+            building.wait(1)
+            return serialize(site)
+
+        def build():
+            try:
+                results.append(listed(None))
+            except Exception as exception:
+                errors.append(exception)
+
+        building = threading.Event()
+        results = []
+        errors = []
+        with mock.patch.object(
+            listing, "serialize", side_effect=slow_serialize
+        ) as serialized:
+            threads = [threading.Thread(target=build) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            building.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        expected = {self.clean.url, self.profane.url}
+        self.assertEqual([sites.keys() for sites in results], [expected] * 4)
+        # One request built the listing, the others waited for it
+        self.assertEqual(serialized.call_count, 2)
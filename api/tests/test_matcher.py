@@ -0,0 +1,63 @@
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from api.checker import PageCheck
+from api.matcher import ProfanityMatcher
+from api.tokenizer import tokenize
+
+PHRASES = (("jerk", "off"), ("bitch",), ("strasse",))
+
+
+class MatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.matcher = ProfanityMatcher(PHRASES)
+
+    def test_words(self):
+        self.assertTrue(self.matcher.contains_profanity(["you", "bitch"]))
+        self.assertFalse(self.matcher.contains_profanity(["bitchy", "jerk"]))
+
+    def test_phrases(self):
+        self.assertTrue(self.matcher.contains_profanity(["jerk", "off", "now"]))
+        self.assertFalse(self.matcher.contains_profanity(["jerk", "it", "off"]))
+        self.assertFalse(self.matcher.contains_profanity(["off", "jerk"]))
+
+    def test_phrases_across_batches(self):
+        scanner = self.matcher.scanner()
+        self.assertFalse(scanner.feed(["please", "jerk"]))
+        self.assertTrue(scanner.feed(["off"]))
+        scanner = self.matcher.scanner()
+        self.assertFalse(scanner.feed(["jerk"]))
+        self.assertFalse(scanner.feed([]))
+        self.assertTrue(scanner.feed(["off"]))
+        scanner = self.matcher.scanner()
+        self.assertFalse(scanner.feed(["jerk"]))
+        self.assertFalse(scanner.feed(["it", "off"]))
+
+    def test_normalized_text(self):
+        for text in ("JERK Off", "ＪＥＲＫ ｏｆｆ", "Bitch!", "STRASSE", "Straße"):
+            with self.subTest(text):
+                self.assertTrue(self.matcher.contains_profanity(tokenize(text)))
+
+    def test_from_file(self):
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8") as file:
+            file.write("# a comment, not a phrase\nJerk  Off\nStraße\nx\n")
+            file.flush()
+            matcher = ProfanityMatcher.from_file(file.name)
+        self.assertTrue(matcher.contains_profanity(tokenize("jerk off")))
+        self.assertTrue(matcher.contains_profanity(tokenize("STRASSE")))
+        self.assertFalse(matcher.contains_profanity(tokenize("a comment x")))
+
+
+class BackendTests(SimpleTestCase):
+    def test_backends(self):
+        for backend, scans, needs_upstream in (
+            ("local", True, False),
+            ("remote", False, True),
+            ("crosscheck", True, True),
+        ):
+            with self.subTest(backend), override_settings(PROFANITY_BACKEND=backend):
+                page = PageCheck({})
+                self.assertEqual(page.scanner is not None, scans)
+                self.assertEqual(page.needs_upstream, needs_upstream)
+                self.assertEqual(page.feed(["bitch"]), scans)
@@ -0,0 +1,85 @@
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from ujson import dumps
+
+from api.models import Site
+from api.pagination import encode_cursor
+from api.tests.fake_redis import CACHES, flush_redis
+
+SITES_URL = "/api/v1/sites"
+
+
+@override_settings(CACHES=CACHES)
+class PaginationTests(TestCase):
+    def setUp(self):
+        flush_redis()
+        now = timezone.now()
+        # Sites checked at the same time fall across page boundaries
+        self.urls = [f"https://example.com/{index:02}" for index in range(7)]
+        for index, url in enumerate(self.urls):
+            Site.objects.create(
+                url=url,
+                contains_profanity=False,
+                last_check_time=now + timedelta(minutes=index // 3),
+            )
+
+    def get(self, url=SITES_URL, **params):
+        return self.client.get(url, params)
+
+    def pages(self, **params):
+        response = self.get(order_by="last_check_time", **params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            yield [site["url"] for site in data["results"]]
+            if data["next"] is None:
+                return
+            response = self.get(data["next"])
+
+    def test_ties_across_pages(self):
+        for page_size in (1, 2, 3, 4, 7, 8):
+            with self.subTest(page_size=page_size):
+                pages = list(self.pages(page_size=page_size))
+                self.assertEqual(sum(pages, []), self.urls)
+                self.assertTrue(all(len(page) == page_size for page in pages[:-1]))
+
+    def test_cursor_of_removed_site(self):
+        site = Site.objects.get(url=self.urls[1])
+        cursor = encode_cursor(site, "last_check_time")
+        site.delete()
+        pages = list(self.pages(cursor=cursor))
+        self.assertEqual(pages, [self.urls[2:]])
+
+    def test_default_page_size(self):
+        with self.settings(SITES_PAGE_SIZE=5):
+            self.assertEqual(
+                [len(page) for page in self.pages()], [5, len(self.urls) - 5]
+            )
+
+    def test_invalid_cursor(self):
+        invalid_cursors = {
+            "not base64": "%%%",
+            "not JSON": base64.urlsafe_b64encode(b"{").decode(),
+            "not a pair": base64.urlsafe_b64encode(b"[1]").decode(),
+            "not a date": base64.urlsafe_b64encode(dumps(("x", "u")).encode()).decode(),
+            "tampered": encode_cursor(Site.objects.first(), "last_check_time")[:-4],
+        }
+        for name, cursor in invalid_cursors.items():
+            with self.subTest(name):
+                response = self.get(order_by="last_check_time", cursor=cursor)
+                self.assertEqual(response.status_code, 400)
+
+    def test_page_size_without_order_by(self):
+        for params in ({"page_size": 2}, {"cursor": "x"}):
+            with self.subTest(params):
+                self.assertEqual(self.get(**params).status_code, 400)
+
+    def test_invalid_page_size(self):
+        for page_size in (0, settings.SITES_MAX_PAGE_SIZE + 1, "x"):
+            with self.subTest(page_size=page_size):
+                response = self.get(order_by="last_check_time", page_size=page_size)
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,80 @@
+import asyncio
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from api import parsing
+from api.exceptions import PageError
+from api.parsing import abuffer_page, buffer_page
+
+INLINE_MAX_BYTES = 100
+
+
+async def async_chunks(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@override_settings(
+    PARSE_PROCESSES=1, PARSE_INLINE_MAX_BYTES=INLINE_MAX_BYTES, PAGE_MAX_BYTES=4096
+)
+@patch.object(parsing, "body_slots", None)
+class BodyTests(SimpleTestCase):
+    def test_small_pages_are_not_buffered(self):
+        chunks, body = buffer_page(iter([b"a" * INLINE_MAX_BYTES]))
+        self.assertEqual(chunks, [b"a" * INLINE_MAX_BYTES])
+        self.assertIsNone(body)
+
+    def test_sized_from_content_length(self):
+        chunks = [b"a" * 60, b"b" * 60, b"c" * 1000]
+        _, body = buffer_page(iter(chunks), content_length=2000)
+        with body:
+            self.assertGreaterEqual(body.memory.size, 2000)
+            self.assertLess(body.memory.size, 4096)
+            self.assertEqual(bytes(body.memory.buf[: body.size]), b"".join(chunks))
+
+    def test_grows(self):
+        chunks = [b"a" * 60, b"b" * 60, *(bytes([index]) * 500 for index in range(7))]
+        _, body = buffer_page(iter(chunks), content_length=10)
+        with body:
+            self.assertEqual(body.size, 3620)
+            self.assertLessEqual(body.memory.size, 4096 * 2)
+            self.assertEqual(bytes(body.memory.buf[: body.size]), b"".join(chunks))
+
+    def test_bodies_wait_for_slots(self):
+        chunks = [b"a" * 60, b"b" * 60]
+
+        async def buffer():
+            _, body = await abuffer_page(async_chunks(chunks))
+            return body
+
+        async def buffer_twice():
+            first = await buffer()
+            second = asyncio.create_task(buffer())
+            await asyncio.sleep(0.05)
+            self.assertFalse(second.done())
+            first.close()
+            (await second).close()
+            # A cancelled wait takes no slot
+            third = await buffer()
+            waiting = asyncio.create_task(buffer())
+            await asyncio.sleep(0.05)
+            waiting.cancel()
+            third.close()
+            (await buffer()).close()
+
+        asyncio.run(buffer_twice())
+
+    def test_broken_pool(self):
+        future = Future()
+        future.set_exception(BrokenProcessPool())
+        with patch.object(parsing, "submit", return_value=(None, future)):
+            for parse in (
+                lambda body: body.parse("utf-8", False, "", True),
+                lambda body: asyncio.run(body.aparse("utf-8", False, "", True)),
+            ):
+                _, body = buffer_page(iter([b"a" * 60, b"b" * 60]))
+                with body, self.assertRaises(PageError):
+                    parse(body)
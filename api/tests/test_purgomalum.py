@@ -0,0 +1,127 @@
+import asyncio
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from api.exceptions import UpstreamError
+from api import purgomalum
+from api.purgomalum import (
+    MAX_CHUNK_LENGTH,
+    acontains_profanity,
+    cache_keys,
+    chunk_length,
+    contains_profanity,
+    observe_latency,
+    request_chunks,
+)
+from api.sessions import close_client_session
+from api.tests.fake_redis import CACHES, flush_redis
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@override_settings(
+    CACHES=CACHES, PURGOMALUM_URL=f"http://127.0.0.1:{closed_port()}/?text="
+)
+class UpstreamErrorTests(SimpleTestCase):
+    def setUp(self):
+        flush_redis()
+
+    def test_connection_error(self):
+        with self.assertRaises(UpstreamError):
+            contains_profanity({"hello"})
+
+    def test_async_connection_error(self):
+        async def check():
+            try:
+                return await acontains_profanity({"hello"})
+            finally:
+                await close_client_session()
+
+        with self.assertRaises(UpstreamError):
+            asyncio.run(check())
+
+
+class InvalidVerdictHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'"yes"'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(CACHES=CACHES)
+class InvalidVerdictTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), InvalidVerdictHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    def setUp(self):
+        flush_redis()
+        port = self.server.server_address[1]
+        settings = self.settings(PURGOMALUM_URL=f"http://127.0.0.1:{port}/?text=")
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def assertNotCached(self):
+        keys = cache_keys(["hello", "world"])
+        self.assertEqual(caches["words"].get_many(keys), {})
+
+    def test_invalid_verdict(self):
+        with self.assertRaises(UpstreamError):
+            contains_profanity({"hello", "world"})
+        self.assertNotCached()
+
+    def test_async_invalid_verdict(self):
+        async def check():
+            try:
+                return await acontains_profanity({"hello", "world"})
+            finally:
+                await close_client_session()
+
+        with self.assertRaises(UpstreamError):
+            asyncio.run(check())
+        self.assertNotCached()
+
+
+@override_settings(PURGOMALUM_CHUNK_LATENCY=1)
+@patch.object(purgomalum, "latency_sums", None)
+class ChunkLengthTests(SimpleTestCase):
+    def test_small_requests_keep_length(self):
+        words = [f"word{index}" for index in range(5000)]
+        chunks = len(request_chunks(words))
+        observe_latency("hello%20world", 0.05)
+        self.assertEqual(chunk_length(), MAX_CHUNK_LENGTH)
+        self.assertEqual(len(request_chunks(words)), chunks)
+
+    def test_slow_requests_shorten_chunks(self):
+        observe_latency("a" * MAX_CHUNK_LENGTH, 4)
+        self.assertEqual(chunk_length(), MAX_CHUNK_LENGTH // 4)
+
+    def test_fits_round_trip_and_time_per_byte(self):
+        # 50 ms round trips and 100 µs per byte leave 9500 bytes per second
+        for length in (MAX_CHUNK_LENGTH, 2000) * 5:
+            observe_latency("a" * length, 0.05 + length * 1e-4)
+        self.assertAlmostEqual(chunk_length(), 9500, delta=1)
+
+    def test_slow_round_trips_keep_length(self):
+        for length in (MAX_CHUNK_LENGTH, 2000) * 5:
+            observe_latency("a" * length, 1.5 + length * 1e-6)
+        self.assertEqual(chunk_length(), MAX_CHUNK_LENGTH)
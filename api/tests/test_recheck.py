@@ -0,0 +1,55 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.checker import Result
+from api.management.commands.recheck import claim
+from api.models import Site
+from api.tests.fake_redis import CACHES, flush_redis
+
+
+def check(url, site):
+    if url == "https://failing.example/":
+        return url, dict(status=502, detail="Could not fetch site.")
+    return url, Result(True)
+
+
+@override_settings(CACHES=CACHES)
+class RecheckTests(TestCase):
+    def setUp(self):
+        flush_redis()
+        self.checked = timezone.now() - timedelta(days=2)
+        for url in ("https://example.com/", "https://failing.example/"):
+            Site.objects.create(
+                url=url, contains_profanity=False, last_check_time=self.checked
+            )
+
+    def test_claims_once_per_lease(self):
+        now = timezone.now()
+        claimed = claim(now - timedelta(days=1), now - timedelta(minutes=10), 1)
+        self.assertEqual(len(claimed), 1)
+        claimed.update(claim(now - timedelta(days=1), now - timedelta(minutes=10), 2))
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(
+            claim(now - timedelta(days=1), now - timedelta(minutes=10), 2), {}
+        )
+        # Expired claims are claimed again
+        later = now + timedelta(minutes=11)
+        self.assertEqual(
+            len(claim(later - timedelta(days=1), later - timedelta(minutes=10), 2)),
+            2,
+        )
+
+    @patch("api.management.commands.recheck.check", check)
+    def test_keeps_last_check_time_of_failed_rechecks(self):
+        call_command("recheck", "--once", stdout=StringIO(), stderr=StringIO())
+        failed = Site.objects.get(url="https://failing.example/")
+        self.assertEqual(failed.last_check_time, self.checked)
+        self.assertEqual(failed.contains_profanity, False)
+        rechecked = Site.objects.get(url="https://example.com/")
+        self.assertGreater(rechecked.last_check_time, self.checked)
+        self.assertEqual(rechecked.contains_profanity, True)
@@ -0,0 +1,22 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.urls import path
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.settings import spectacular_settings
+
+from api.views import acheck, check_view
+
+
+def check_schema(view):
+    generator = SchemaGenerator(patterns=[path("api/v1/check", view)])
+    return generator.get_schema(public=True)["paths"].get("/api/v1/check")
+
+
+# Without the examples added from the stored sites
+@patch.object(spectacular_settings, "POSTPROCESSING_HOOKS", [])
+class SchemaTests(SimpleTestCase):
+    def test_async_check(self):
+        schema = check_schema(check_view)
+        self.assertIn("get", schema)
+        self.assertEqual(check_schema(acheck), schema)
@@ -0,0 +1,28 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from api.sessions import get_client_session
+from profanity_checker.asgi import application
+
+
+class LifespanTests(SimpleTestCase):
+    def test_shutdown_closes_client_sessions(self):
+        async def serve():
+            sessions = [get_client_session(), get_client_session(False)]
+            messages = asyncio.Queue()
+            sent = []
+            for message_type in ("lifespan.startup", "lifespan.shutdown"):
+                messages.put_nowait({"type": message_type})
+
+            async def send(message):
+                sent.append(message["type"])
+
+            await application({"type": "lifespan"}, messages.get, send)
+            return sessions, sent
+
+        sessions, sent = asyncio.run(serve())
+        self.assertEqual(
+            sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        )
+        self.assertTrue(all(session.closed for session in sessions))
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from api.listing import get_listing
+from api.models import Site
+from api import singleflight
+from api.singleflight import (
+    acheck_site_once,
+    check_site_once,
+    normalize_url,
+    stored_result,
+)
+from api.tests.fake_redis import CACHES, flush_redis
+
+
+@override_settings(CACHES=CACHES)
+class StoredResultTests(TestCase):
+    def setUp(self):
+        flush_redis()
+        self.site = Site.objects.create(
+            url="https://example.com/",
+            contains_profanity=False,
+            last_check_time=timezone.now() - timedelta(hours=1),
+        )
+
+    def test_no_max_age(self):
+        self.assertIsNone(stored_result(self.site.url, 0))
+
+    def test_reads_listing(self):
+        get_listing(None)
+        # Changed behind the listing, which is recent enough to be trusted
+        Site.objects.filter(url=self.site.url).update(contains_profanity=True)
+        self.assertEqual(stored_result(self.site.url, 2 * 60 * 60)[0], False)
+
+    def test_falls_back_to_table_if_listed_too_long_ago(self):
+        get_listing(None)
+        Site.objects.filter(url=self.site.url).update(
+            contains_profanity=True, last_check_time=timezone.now()
+        )
+        self.assertEqual(stored_result(self.site.url, 60), (True, 0))
+
+    def test_too_old(self):
+        self.assertIsNone(stored_result(self.site.url, 60))
+
+
+class NormalizeUrlTests(SimpleTestCase):
+    def test_normalizes(self):
+        self.assertEqual(
+            normalize_url("HTTP://Example.com:80?q=1#top"), "http://example.com/?q=1"
+        )
+        self.assertEqual(normalize_url("https://[::1]:8443/a"), "https://[::1]:8443/a")
+
+    def test_invalid_port(self):
+        with self.assertRaises(ValidationError):
+            normalize_url("http://example.com:99999/")
+
+
+@override_settings(SINGLE_FLIGHT_TIMEOUT=0.05)
+class CheckSiteOnceTests(SimpleTestCase):
+    url = "https://example.com/"
+
+    def test_followers_give_up_waiting(self):
+        release = threading.Event()
+
+        def slow_check(url):
+            release.wait()
+            return url, "shared"
+
+        with patch.object(
+            singleflight, "check_across_processes", slow_check
+        ), patch.object(
+            singleflight, "check_and_save", lambda url: (url, "own")
+        ), patch.object(
+            singleflight, "write_result"
+        ):
+            leader = threading.Thread(target=check_site_once, args=(self.url,))
+            leader.start()
+            while normalize_url(self.url) not in singleflight.in_flight:
+                release.wait(0.001)
+            try:
+                self.assertEqual(check_site_once(self.url), "own")
+            finally:
+                release.set()
+                leader.join()
+
+    def test_async_followers_give_up_waiting(self):
+        async def check():
+            release = asyncio.Event()
+
+            async def slow_check(url):
+                await release.wait()
+                return url, "shared"
+
+            async def own_check(url):
+                return url, "own"
+
+            with patch.object(
+                singleflight, "acheck_across_processes", slow_check
+            ), patch.object(singleflight, "acheck_and_save", own_check):
+                leader = asyncio.create_task(acheck_site_once(self.url))
+                await asyncio.sleep(0)
+                try:
+                    return await acheck_site_once(self.url)
+                finally:
+                    release.set()
+                    self.assertEqual(await leader, "shared")
+
+        self.assertEqual(asyncio.run(check()), "own")
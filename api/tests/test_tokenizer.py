@@ -0,0 +1,46 @@
+import random
+import string
+import unicodedata
+
+from django.test import SimpleTestCase
+
+from api.tokenizer import WORD, split_trailing_word, tokenize
+
+TEXTS = (
+    "Hello, World! It's snake_case and CamelCase",
+    "don't can't o'clock rock'n'roll",
+    "2nd 3rd 10 a1 b_2 __init__ x",
+    "ＦＵＬＬｗｉｄｔｈ ＡＢＣ １２３",
+    "ﬁne ﬂow ﬀ oﬃce",
+    "Straße GROSS Ǆemal ǅ",
+    "café naïve Ⅻ ①② x²",
+    "tab\tnew\nline\r\nend",
+)
+
+
+def reference_tokenize(text):
+    return WORD.findall(unicodedata.normalize("NFKC", text).casefold())
+
+
+class TokenizerTests(SimpleTestCase):
+    def test_ascii_path_matches_unicode_path(self):
+        for text in TEXTS:
+            with self.subTest(text):
+                self.assertEqual(tokenize(text), reference_tokenize(text))
+        rng = random.Random(0)
+        alphabet = string.printable + "ＡＢｚ０ﬁﬂß'’éİ"
+        for length in range(1, 200):
+            for characters in (string.printable, alphabet):
+                text = "".join(rng.choices(characters, k=length))
+                with self.subTest(text=text):
+                    self.assertEqual(tokenize(text), reference_tokenize(text))
+
+    def test_compatibility_forms(self):
+        self.assertEqual(tokenize("ＦＵＬＬ ﬁne"), tokenize("full fine"))
+        self.assertEqual(tokenize("Straße"), ["strasse"])
+        self.assertEqual(tokenize("it's a_b 1"), ["it"])
+
+    def test_split_trailing_word(self):
+        self.assertEqual(split_trailing_word("one two"), ("one ", "two"))
+        self.assertEqual(split_trailing_word("one two "), ("one two ", ""))
+        self.assertEqual(split_trailing_word("Grü"), ("", "Grü"))
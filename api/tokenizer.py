@@ -0,0 +1,24 @@
+import re
+import unicodedata
+
+# Words are runs of at least two letters or digits, any other character
+# separates them, so "word," and "Word" are both "word"
+WORD = re.compile(r"[^\W_]{2,}")
+ASCII_WORD = re.compile(r"[a-z0-9]{2,}")
+
+
+def tokenize(text):
+    if text.isascii():
+        # ASCII text is NFKC normalized already, and casefolds as it lowers
+        return ASCII_WORD.findall(text.lower())
+    # NFKC folds compatibility forms, e.g. fullwidth letters and ligatures,
+    # casefold then folds case more thoroughly than lower, e.g. "ß" is "ss"
+    return WORD.findall(unicodedata.normalize("NFKC", text).casefold())
+
+
+def split_trailing_word(text):
+    # The word at the end of a text may continue in the text that follows
+    end = len(text)
+    while end > 0 and text[end - 1].isalnum():
+        end -= 1
+    return text[:end], text[end:]
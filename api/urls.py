@@ -1,7 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
-from .views import SiteViewSet
+from .views import DomainViewSet, JobViewSet, SiteViewSet, acheck, check_view
 
 urlpatterns = [
     path(
@@ -17,7 +18,15 @@ urlpatterns = [
                         ]
                     ),
                 ),
-                path("check", SiteViewSet.as_view({"get": "check"})),
+                path("check", acheck if settings.ASYNC_CHECK else check_view),
+                path("checks", SiteViewSet.as_view({"post": "checks"})),
+                path("crawl", DomainViewSet.as_view({"get": "crawl"})),
+                path("domain", DomainViewSet.as_view({"get": "domain"})),
+                path(
+                    "jobs/<uuid:pk>",
+                    JobViewSet.as_view({"get": "retrieve"}),
+                    name="job",
+                ),
                 path(
                     "site",
                     include(
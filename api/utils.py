@@ -35,11 +35,11 @@ def custom_exception_handler(exception, context):
     return exception_handler(exception, context)
 
 
-def split_quoted_text(text, max_split_len=16352):
+def split_quoted_text(text, max_split_len=16352, separator="%"):
     start, end = 0, max_split_len
     while end < len(text):
-        index = text.rfind("%", start, end)
-        if index > 0:
+        index = text.rfind(separator, start, end)
+        if index > start:
             end = index
         yield text[start:end]
         start = end
@@ -59,10 +59,12 @@ def query_param(
     param = request.query_params[param_name]
     if len(param) == 0:
         raise ValidationError(f"Parameter '{param_name}' must not be blank.")
-    field.run_validators(param)
     if isinstance(field, BooleanField):
         param = param.capitalize()
     param = field.to_python(param)
+    field.run_validators(param)
+    if field.choices:
+        field.validate(param, None)
     if isinstance(field, DateTimeField):
         param = timezone.localtime(param, timezone=timezone.utc)
     return param
@@ -85,15 +87,3 @@ def query_params(request, fields: Iterable, required=False):
 def check_unknown_params(params):
     if params:
         raise ValidationError([f"Unknown parameter '{param}'." for param in params])
-
-
-def median_datetime(queryset, term):
-    try:
-        count = queryset.count()
-    except:
-        count = 0
-    if count == 0:
-        datetime = timezone.now()
-    else:
-        datetime = queryset.values_list(term, flat=True).order_by(term)[count // 2]
-    return timezone.localtime(datetime)
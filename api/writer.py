@@ -0,0 +1,71 @@
+import atexit
+import logging
+import os
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .checker import save_results
+
+logger = logging.getLogger(__name__)
+
+pending = {}
+condition = threading.Condition()
+flusher = None
+
+
+def write_result(url, result):
+    global flusher
+    if settings.RESULT_FLUSH_INTERVAL <= 0:
+        save_results({url: result})
+        return
+    with condition:
+        pending[url] = result
+        if flusher is None:
+            flusher = threading.Thread(target=flush_periodically, daemon=True)
+            flusher.start()
+        if len(pending) >= settings.RESULT_BATCH_SIZE:
+            condition.notify()
+
+
+awrite_result = sync_to_async(write_result)
+
+
+def take_pending():
+    global pending
+    with condition:
+        results, pending = pending, {}
+    return results
+
+
+def flush_results():
+    save_results(take_pending())
+
+
+def flush_periodically():
+    while True:
+        with condition:
+            condition.wait_for(
+                lambda: len(pending) >= settings.RESULT_BATCH_SIZE,
+                settings.RESULT_FLUSH_INTERVAL,
+            )
+        results = take_pending()
+        try:
+            save_results(results)
+        except Exception:
+            logger.exception("Could not save %d check results", len(results))
+        finally:
+            connections.close_all()
+
+
+def reset_writer():
+    global pending, condition, flusher
+    pending = {}
+    condition = threading.Condition()
+    flusher = None
+
+
+atexit.register(flush_results)
+os.register_at_fork(after_in_child=reset_writer)
@@ -0,0 +1,73 @@
+"""Compare how many checks the WSGI and ASGI paths keep in flight.
+
+Both paths check the same pages served by a local stub with a fixed
+latency, with PurgoMalum replaced by the same stub, and store their results
+in a scratch test database. The WSGI path is limited by its thread count, the
+ASGI path only by the event loop.
+
+    python -m benchmarks.check_concurrency --requests 200 --threads 8
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.django_setup import scratch_database, setup
+from benchmarks.stub import StubServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--backend", default="remote")
+    args = parser.parse_args()
+
+    setup()
+    from django.test import RequestFactory, override_settings
+
+    from api.sessions import close_client_session
+    from api.views import SiteViewSet, acheck
+
+    factory = RequestFactory()
+    view = SiteViewSet.as_view({"get": "check"})
+
+    with scratch_database(), StubServer(
+        latency=args.latency
+    ) as stub, override_settings(
+        PURGOMALUM_URL=stub.purgomalum_url, PROFANITY_BACKEND=args.backend
+    ):
+
+        def requests(offset):
+            return tuple(
+                factory.get("/api/v1/check", {"url": f"{stub.url}/pages/{index}"})
+                for index in range(offset, offset + args.requests)
+            )
+
+        def run_wsgi():
+            with ThreadPoolExecutor(args.threads) as executor:
+                return tuple(executor.map(view, requests(0)))
+
+        async def run_asgi():
+            try:
+                return await asyncio.gather(*map(acheck, requests(args.requests)))
+            finally:
+                await close_client_session()
+
+        for name, run in (
+            (f"WSGI ({args.threads} threads)", run_wsgi),
+            ("ASGI", lambda: asyncio.run(run_asgi())),
+        ):
+            start = time.perf_counter()
+            responses = run()
+            elapsed = time.perf_counter() - start
+            failed = sum(response.status_code != 200 for response in responses)
+            print(
+                f"{name}: {args.requests} checks in {elapsed:.2f}s, "
+                f"{args.requests / elapsed:.1f} checks/s, {failed} failed"
+            )
+
+
+if __name__ == "__main__":
+    main()
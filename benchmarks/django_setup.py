@@ -0,0 +1,55 @@
+import os
+from contextlib import contextmanager
+
+import django
+from environ import Env
+
+# Name of the scratch database, passed on to the processes a benchmark starts
+SCRATCH_DATABASE = "BENCHMARK_SCRATCH_DATABASE"
+
+# Cache keys of benchmarks, e.g. verdicts of the stub standing in for
+# PurgoMalum, are kept apart from those of the configured caches
+CACHE_KEY_PREFIX = "benchmark"
+
+
+def setup():
+    Env.read_env()
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "profanity_checker.settings")
+    from django.conf import settings
+
+    for cache in settings.CACHES.values():
+        prefixes = (CACHE_KEY_PREFIX, cache.get("KEY_PREFIX"))
+        cache["KEY_PREFIX"] = ":".join(filter(None, prefixes))
+    if SCRATCH_DATABASE in os.environ:
+        settings.DATABASES["default"]["NAME"] = os.environ[SCRATCH_DATABASE]
+    django.setup()
+
+
+@contextmanager
+def scratch_database(keepdb=False):
+    # Sites are seeded and checked in the test database of the configured one,
+    # created and destroyed as by manage.py test, never in the configured one
+    from django.core.cache import caches
+    from django.db import connection, connections
+    from django.test.utils import setup_databases, teardown_databases
+
+    old_config = setup_databases(
+        0, False, keepdb=keepdb, aliases={"default"}, serialized_aliases=()
+    )
+    os.environ[SCRATCH_DATABASE] = connection.settings_dict["NAME"]
+    try:
+        yield
+    finally:
+        del os.environ[SCRATCH_DATABASE]
+        connections.close_all()
+        teardown_databases(old_config, 0, keepdb=keepdb)
+        for cache in caches.all():
+            cache.delete_pattern("*")
+
+
+def add_keepdb_argument(parser):
+    parser.add_argument(
+        "--keepdb",
+        action="store_true",
+        help="Keep the scratch database and its seeded sites for the next run",
+    )
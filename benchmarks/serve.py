@@ -0,0 +1,149 @@
+"""Compare check throughput of runserver and manage.py serve.
+
+Each server is started in turn on a free port and sent the same number of
+checks of distinct generated corpus pages from --concurrency client threads.
+The pages are served gzipped by a local stub, which also stands in for
+PurgoMalum. runserver handles every check in one process, serve in --workers
+processes forked from the preloaded app, with --asgi as well if given. Servers
+store their results in a scratch test database.
+
+    python -m benchmarks.serve --requests 500 --concurrency 16 --workers 4
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from urllib3 import PoolManager
+
+from benchmarks.django_setup import scratch_database, setup
+from benchmarks.stub import StubServer
+from benchmarks.suite import parse_size, summary
+
+STARTUP_TIMEOUT = 30
+
+# manage.py, set up as benchmarks are, so that servers use the scratch database
+MANAGE = """
+import sys
+
+from benchmarks.django_setup import setup
+
+setup()
+from django.core.management import execute_from_command_line
+
+execute_from_command_line(["manage.py", *sys.argv[1:]])
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_listening(port, process):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("Server did not start listening")
+
+
+def run_checks(port, urls, concurrency):
+    http = PoolManager(maxsize=concurrency)
+
+    def timed(url):
+        start = time.perf_counter()
+        response = http.request(
+            "GET", f"http://127.0.0.1:{port}/api/v1/check?url={quote(url)}"
+        )
+        return time.perf_counter() - start, response.status != 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = tuple(executor.map(timed, urls))
+    elapsed = time.perf_counter() - start
+    return summary(
+        [duration for duration, _ in results],
+        elapsed,
+        sum(failed for _, failed in results),
+    )
+
+
+def benchmark(command, urls, args, environment):
+    port = free_port()
+    process = subprocess.Popen(
+        (sys.executable, "-c", MANAGE, *command(port)),
+        env=environment,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_listening(port, process)
+        run_checks(port, urls[: args.concurrency], args.concurrency)
+        return run_checks(port, urls[args.concurrency :], args.concurrency)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--page-size", type=parse_size, default=parse_size("64KB"))
+    parser.add_argument("--asgi", action="store_true")
+    args = parser.parse_args()
+
+    setup()
+    servers = [
+        ("runserver", lambda port: ("runserver", "--noreload", str(port))),
+        (
+            f"serve ({args.workers} WSGI workers)",
+            lambda port: (
+                *("serve", "--no-asgi", "--bind", f"127.0.0.1:{port}"),
+                *("--workers", str(args.workers)),
+            ),
+        ),
+    ]
+    if args.asgi:
+        servers.append(
+            (
+                f"serve ({args.workers} ASGI workers)",
+                lambda port: (
+                    *("serve", "--asgi", "--bind", f"127.0.0.1:{port}"),
+                    *("--workers", str(args.workers)),
+                ),
+            )
+        )
+    with scratch_database(), StubServer() as stub:
+        environment = dict(os.environ, PURGOMALUM_URL=stub.purgomalum_url)
+        for offset, (name, command) in enumerate(servers):
+            # Pages are distinct across servers, so that none is served stored
+            # results or shares checks in flight
+            first = offset * (args.requests + args.concurrency)
+            urls = tuple(
+                f"{stub.url}/corpus/{args.page_size}?page={index}"
+                for index in range(first, first + args.requests + args.concurrency)
+            )
+            result = benchmark(command, urls, args, environment)
+            print(
+                f"{name}: {result['throughput']:.1f} checks/s, "
+                f"p50 {result['p50']:.0f}ms, p99 {result['p99']:.0f}ms, "
+                f"{result['failed']} failed"
+            )
+
+
+if __name__ == "__main__":
+    main()
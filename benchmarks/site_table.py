@@ -0,0 +1,132 @@
+"""Measure Site lookup and sites filter latency on a large table.
+
+Seeds a scratch test database with generated sites if it holds fewer than
+--rows, then times each query over random samples. Seeding several million
+rows takes a while, --keepdb keeps them for the next run.
+
+    python -m benchmarks.site_table --rows 5000000 --samples 200
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from benchmarks.django_setup import add_keepdb_argument, scratch_database, setup
+
+SEED_BATCH_SIZE = 10000
+SAMPLE_URLS = 1000
+
+
+def seed(Site, url_hash, rows):
+    from django.utils import timezone
+
+    existing = Site.objects.count()
+    now = timezone.now()
+    generator = random.Random(existing)
+    for start in range(existing, rows, SEED_BATCH_SIZE):
+        sites = []
+        for index in range(start, min(start + SEED_BATCH_SIZE, rows)):
+            url = f"https://site-{index}.example.com/{'path/' * (index % 40)}{index}"
+            checked = now - timedelta(seconds=generator.randrange(30 * 86400))
+            sites.append(
+                Site(
+                    url=url,
+                    url_hash=url_hash(url),
+                    contains_profanity=generator.random() < 0.1,
+                    last_check_time=checked,
+                    last_status_update_time=checked
+                    - timedelta(seconds=generator.randrange(30 * 86400)),
+                )
+            )
+        Site.objects.bulk_create(sites)
+        print(f"Seeded {start + len(sites)}/{rows} sites", end="\r", flush=True)
+    if rows > existing:
+        print()
+
+
+def timed(query, samples):
+    durations = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        query()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return (
+        statistics.median(durations),
+        durations[int(len(durations) * 0.95) - 1],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=100)
+    add_keepdb_argument(parser)
+    args = parser.parse_args()
+
+    setup()
+    with scratch_database(args.keepdb):
+        benchmark(args)
+
+
+def benchmark(args):
+    from django.db import connection
+    from django.utils import timezone
+
+    from api.models import Site, url_hash
+
+    seed(Site, url_hash, args.rows)
+    urls = tuple(Site.objects.order_by("?").values_list("url", flat=True)[:SAMPLE_URLS])
+    now = timezone.now()
+
+    def recent(days):
+        return now - timedelta(days=days)
+
+    queries = {
+        "lookup by url": lambda: Site.objects.filter(url=random.choice(urls)).first(),
+        "lookup by url hash": lambda: Site.objects.by_url(random.choice(urls)).first(),
+        "bulk lookup by url (100)": lambda: Site.objects.in_bulk(
+            random.sample(urls, 100)
+        ),
+        "bulk lookup by url hash (100)": lambda: Site.objects.by_urls(
+            random.sample(urls, 100)
+        ),
+        "contains_profanity, last_check_after (1 day)": lambda: list(
+            Site.objects.filter(
+                contains_profanity=True, last_check_time__gt=recent(1)
+            ).values_list("url", flat=True)
+        ),
+        "contains_profanity, last_status_update_after (1 day)": lambda: list(
+            Site.objects.filter(
+                contains_profanity=True, last_status_update_time__gt=recent(1)
+            ).values_list("url", flat=True)
+        ),
+        "last_check_after (1 hour)": lambda: list(
+            Site.objects.filter(last_check_time__gt=recent(1 / 24)).values_list(
+                "url", flat=True
+            )
+        ),
+        "contains_profanity page ordered by last_check_time": lambda: list(
+            Site.objects.filter(
+                contains_profanity=True,
+                last_check_time__gte=recent(random.random() * 30),
+            ).order_by("last_check_time", "url")[: args.page_size]
+        ),
+    }
+
+    print(f"{Site.objects.count()} sites on {connection.vendor}")
+    # Lookups by hash should scan the url_hash index, not the url primary key
+    for name, sites in (
+        ("lookup by url", Site.objects.filter(url=urls[0])),
+        ("lookup by url hash", Site.objects.by_url(urls[0])),
+    ):
+        print(f"{name} plan: {sites.explain().splitlines()[0]}")
+    for name, query in queries.items():
+        p50, p95 = timed(query, args.samples)
+        print(f"{name}: p50 {p50:.2f}ms, p95 {p95:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Measure cold import of the URL configuration against growing Site tables.
+
+For each row count the table of a scratch test database is seeded up to that
+size, then fresh interpreters set up Django and import the URL configuration,
+which imports every view. Import time and the number of queries run during it are reported
+for each size and should not grow with the table.
+
+    python -m benchmarks.startup --rows 0 100000 1000000 5000000 --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from benchmarks.django_setup import add_keepdb_argument, scratch_database, setup
+
+IMPORT = """
+import json
+import time
+from importlib import import_module
+
+from benchmarks.django_setup import setup
+
+setup()
+from django.conf import settings
+from django.db import connection
+
+queries = []
+start = time.perf_counter()
+with connection.execute_wrapper(
+    lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)
+):
+    import_module(settings.ROOT_URLCONF)
+print(json.dumps(dict(seconds=time.perf_counter() - start, queries=len(queries))))
+"""
+
+
+def cold_import():
+    output = subprocess.run(
+        (sys.executable, "-c", IMPORT), capture_output=True, check=True, text=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=(0, 1_000_000))
+    parser.add_argument("--runs", type=int, default=5)
+    add_keepdb_argument(parser)
+    args = parser.parse_args()
+
+    setup()
+    from api.models import Site, url_hash
+    from benchmarks.site_table import seed
+
+    with scratch_database(args.keepdb):
+        for rows in sorted(args.rows):
+            seed(Site, url_hash, rows)
+            imports = tuple(cold_import() for _ in range(args.runs))
+            seconds = statistics.median(result["seconds"] for result in imports)
+            queries = max(result["queries"] for result in imports)
+            print(
+                f"{Site.objects.count()} sites: import {seconds * 1000:.0f}ms, "
+                f"{queries} queries"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import asyncio
+import gzip
+import random
+import string
+import threading
+from functools import cache
+
+from aiohttp import web
+
+PROFANE_WORD = "bitch"
+
+
+def page(index, words=500):
+    rng = random.Random(index)
+    text = " ".join(
+        rng.choice(("lorem", "ipsum", "dolor", "sit", "amet", "consectetur"))
+        for _ in range(words)
+    )
+    return f"<html><head><title>Page {index}</title></head><body><p>{text}</p></body></html>"
+
+
+@cache
+def vocabulary(words=5000):
+    rng = random.Random(words)
+    return tuple(
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 12)))
+        for _ in range(words)
+    )
+
+
+# HTML page of about size bytes, with the profane word at the very end if
+# profane so that checks read the whole page
+@cache
+def corpus_page(size, profane=False):
+    rng = random.Random(size)
+    words = vocabulary()
+    parts = ["<html><head><title>Corpus page</title></head><body>"]
+    length = len(parts[0])
+    while length < size:
+        paragraph = " ".join(rng.choices(words, k=rng.randint(20, 200)))
+        link = rng.choice(words)
+        part = (
+            f"<p>{paragraph} <a href='/{link}'>{link}</a></p>"
+            f"<script>var {link} = {rng.random()};</script>"
+        )
+        parts.append(part)
+        length += len(part)
+    if profane:
+        parts.append(f"<p>{PROFANE_WORD}</p>")
+    parts.append("</body></html>")
+    return "\n".join(parts).encode()
+
+
+@cache
+def compressed_corpus_page(size, profane=False):
+    return gzip.compress(corpus_page(size, profane), 6)
+
+
+class StubServer:
+    def __init__(self, latency=0.0, failure_rate=0.0, port=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.port = port
+        self.page_requests = 0
+        self.page_bytes = 0
+        self.upstream_requests = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def purgomalum_url(self):
+        return self.url + "/service/containsprofanity?text="
+
+    async def delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def page(self, request):
+        self.page_requests += 1
+        await self.delay()
+        return web.Response(
+            text=page(int(request.match_info["index"])), content_type="text/html"
+        )
+
+    async def corpus(self, request):
+        self.page_requests += 1
+        await self.delay()
+        size, profane = int(request.match_info["size"]), "profane" in request.query
+        # Served compressed to clients accepting it, as most sites are
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            body = compressed_corpus_page(size, profane)
+            headers = {"Content-Encoding": "gzip"}
+        else:
+            body = corpus_page(size, profane)
+            headers = {}
+        self.page_bytes += len(body)
+        return web.Response(body=body, content_type="text/html", headers=headers)
+
+    async def contains_profanity(self, request):
+        self.upstream_requests += 1
+        await self.delay()
+        if random.random() < self.failure_rate:
+            raise web.HTTPServiceUnavailable()
+        return web.Response(text=str(PROFANE_WORD in request.query["text"]).lower())
+
+    async def start(self):
+        app = web.Application()
+        app.add_routes(
+            (
+                web.get("/pages/{index}", self.page),
+                web.get("/corpus/{size}", self.corpus),
+                web.get("/service/containsprofanity", self.contains_profanity),
+            )
+        )
+        self.runner = web.AppRunner(app, access_log=None, max_line_size=65536)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def __enter__(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.start(), self.loop).result()
+        return self
+
+    def __exit__(self, *exc_info):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
@@ -0,0 +1,260 @@
+"""Run the benchmark suite and save its results as JSON.
+
+Checks fetch pages of a generated corpus served by a local stub, gzipped to
+clients accepting it, which also stands in for PurgoMalum with the given latency and failure rate. site and
+sites run against a scratch test database, seeded up to each of --rows and
+dropped afterwards unless --keepdb is given.
+split_quoted_text and word extraction are timed on their own. Pass an
+earlier output to --compare to print the change of every result.
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --output after.json --compare before.json
+"""
+import argparse
+import json
+import random
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import quote
+
+from benchmarks.django_setup import add_keepdb_argument, scratch_database, setup
+from benchmarks.stub import StubServer, corpus_page, vocabulary
+
+UNITS = {"KB": 1024, "MB": 1024**2, "B": 1}
+
+
+def parse_size(size):
+    for unit, factor in UNITS.items():
+        if size.upper().endswith(unit):
+            return int(float(size[: -len(unit)]) * factor)
+    return int(size)
+
+
+def summary(durations, elapsed, failed):
+    durations = sorted(durations)
+
+    def percentile(fraction):
+        return durations[max(int(len(durations) * fraction + 0.5) - 1, 0)] * 1000
+
+    return dict(
+        requests=len(durations),
+        failed=failed,
+        throughput=len(durations) / elapsed,
+        p50=percentile(0.5),
+        p95=percentile(0.95),
+        p99=percentile(0.99),
+    )
+
+
+def run_requests(view, requests, concurrency):
+    def timed(request):
+        start = time.perf_counter()
+        response = view(request)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        else:
+            response.render()
+        return time.perf_counter() - start, response.status_code >= 400
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        timings = tuple(executor.map(timed, requests))
+    elapsed = time.perf_counter() - start
+    return summary(
+        (duration for duration, _ in timings),
+        elapsed,
+        sum(failed for _, failed in timings),
+    )
+
+
+def best_of(function, repeats):
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def benchmark_checks(args, factory, stub, results):
+    from api.views import SiteViewSet
+
+    view = SiteViewSet.as_view({"get": "check"})
+    for size in map(parse_size, args.page_sizes):
+        corpus_page(size)
+        requests = tuple(
+            factory.get(
+                "/api/v1/check", {"url": f"{stub.url}/corpus/{size}?request={index}"}
+            )
+            for index in range(args.check_requests)
+        )
+        name = f"check {size} B page"
+        page_bytes = stub.page_bytes
+        results[name] = run_requests(view, requests, args.concurrency)
+        results[name]["transferred"] = (stub.page_bytes - page_bytes) / len(requests)
+        print(name, format_result(results[name]))
+
+
+def benchmark_sites(args, factory, results):
+    from django.utils import timezone
+
+    from api.models import Site, url_hash
+    from api.views import SiteViewSet
+    from benchmarks.site_table import SAMPLE_URLS, seed
+
+    site_view = SiteViewSet.as_view({"get": "site"})
+    sites_view = SiteViewSet.as_view({"get": "sites"})
+    for rows in sorted(args.rows):
+        seed(Site, url_hash, rows)
+        urls = tuple(
+            Site.objects.order_by("?").values_list("url", flat=True)[:SAMPLE_URLS]
+        )
+        last_hour = (timezone.now() - timedelta(hours=1)).isoformat()
+        benchmarks = {
+            "site": (site_view, lambda: {"url": random.choice(urls)}),
+            "sites contains_profanity, last_check_after": (
+                sites_view,
+                lambda: {"contains_profanity": "true", "last_check_after": last_hour},
+            ),
+            "sites page": (sites_view, lambda: {"order_by": "last_check_time"}),
+            "sites page, contains_profanity": (
+                sites_view,
+                lambda: {
+                    "order_by": "last_status_update_time",
+                    "contains_profanity": "true",
+                },
+            ),
+        }
+        for name, (view, params) in benchmarks.items():
+            requests = tuple(
+                factory.get("/api/v1/", params()) for _ in range(args.requests)
+            )
+            name = f"{name} {rows} rows"
+            results[name] = run_requests(view, requests, args.concurrency)
+            print(name, format_result(results[name]))
+
+
+def benchmark_functions(args, results):
+    from django.conf import settings
+
+    from api.extraction import TextExtractor
+    from api.utils import split_quoted_text
+
+    words = vocabulary()
+    text = quote(" ".join(random.Random(0).choices(words, k=args.split_words)))
+    seconds = best_of(lambda: tuple(split_quoted_text(text, separator="%20")), 5)
+    results["split_quoted_text"] = dict(
+        seconds=seconds, throughput=len(text) / seconds / 1024**2
+    )
+
+    page = corpus_page(parse_size(args.extraction_size))
+    chunk_size = settings.PAGE_CHUNK_SIZE
+
+    def extract():
+        extractor = TextExtractor()
+        for start in range(0, len(page), chunk_size):
+            extractor.feed_bytes(page[start : start + chunk_size])
+        extractor.close()
+
+    seconds = best_of(extract, 5)
+    results["extraction"] = dict(
+        seconds=seconds, throughput=len(page) / seconds / 1024**2
+    )
+    for name in ("split_quoted_text", "extraction"):
+        print(name, format_result(results[name]))
+
+
+def format_result(result):
+    if "p50" in result:
+        return (
+            f"{result['throughput']:.1f} requests/s, p50 {result['p50']:.1f}ms, "
+            f"p95 {result['p95']:.1f}ms, p99 {result['p99']:.1f}ms, "
+            f"{result['failed']} failed"
+            + (
+                f", {result['transferred'] / 1024:.1f} KB transferred per page"
+                if "transferred" in result
+                else ""
+            )
+        )
+    return f"{result['seconds'] * 1000:.1f}ms, {result['throughput']:.1f} MB/s"
+
+
+def compare(previous, results):
+    print(f"Compared with {previous['revision']}")
+    for name, result in results.items():
+        if name not in previous["results"]:
+            continue
+        old = previous["results"][name]
+        changes = [
+            f"{metric} {old[metric]:.1f} -> {result[metric]:.1f} "
+            f"({(result[metric] / old[metric] - 1) * 100 if old[metric] else 0:+.0f}%)"
+            for metric in ("throughput", "p50", "p99")
+            if metric in result
+        ]
+        print(f"{name}: {', '.join(changes)}")
+
+
+def revision():
+    try:
+        return subprocess.run(
+            ("git", "rev-parse", "--short", "HEAD"),
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare")
+    parser.add_argument("--rows", type=int, nargs="+", default=(10_000, 1_000_000))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--page-sizes", nargs="+", default=("4KB", "100KB", "1MB", "10MB", "30MB")
+    )
+    parser.add_argument("--check-requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--backend")
+    parser.add_argument("--split-words", type=int, default=100_000)
+    parser.add_argument("--extraction-size", default="10MB")
+    add_keepdb_argument(parser)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.test import RequestFactory, override_settings
+
+    factory = RequestFactory()
+    results = {}
+    with scratch_database(args.keepdb):
+        with StubServer(args.latency, args.failure_rate) as stub, override_settings(
+            PURGOMALUM_URL=stub.purgomalum_url,
+            PROFANITY_BACKEND=args.backend or settings.PROFANITY_BACKEND,
+        ):
+            benchmark_checks(args, factory, stub, results)
+        benchmark_sites(args, factory, results)
+    benchmark_functions(args, results)
+
+    output = dict(
+        revision=revision(),
+        time=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        args=vars(args),
+        results=results,
+    )
+    with open(args.output, "w") as file:
+        json.dump(output, file, indent=4)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), results)
+
+
+if __name__ == "__main__":
+    main()
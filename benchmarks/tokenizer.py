@@ -0,0 +1,83 @@
+"""Compare the tokenizer with the whitespace split it replaced.
+
+Text is tokenized block by block, as text nodes of pages are, once with
+api.tokenizer and once by splitting on whitespace, dropping one-character
+words and lowering the rest. Tokens per second and the number of unique
+words, each of which PurgoMalum is asked about, are reported for both. The
+text is generated from the corpus vocabulary with mixed case and punctuation
+attached, or read from --file with a block per line.
+
+    python -m benchmarks.tokenizer --words 1000000
+    python -m benchmarks.tokenizer --file page.txt
+"""
+import argparse
+import random
+import time
+
+from api.tokenizer import tokenize
+from benchmarks.stub import vocabulary
+
+PUNCTUATION = ",.;:!?\"')"
+
+
+def generate_blocks(words, seed=0):
+    rng = random.Random(seed)
+    vocabulary_words = vocabulary()
+    blocks = []
+    while words > 0:
+        block = []
+        for _ in range(min(rng.randint(20, 200), words)):
+            word = rng.choice(vocabulary_words)
+            variant = rng.random()
+            if variant < 0.2:
+                word = word.capitalize()
+            elif variant < 0.25:
+                word = word.upper()
+            if rng.random() < 0.15:
+                word += rng.choice(PUNCTUATION)
+            if rng.random() < 0.05:
+                word = rng.choice("(\"'") + word
+            block.append(word)
+        blocks.append(" ".join(block))
+        words -= len(block)
+    return blocks
+
+
+def split_words(text):
+    return [word.lower() for word in text.split() if len(word) > 1]
+
+
+def measure(split, blocks, repeats):
+    seconds = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        tokens = [split(block) for block in blocks]
+        seconds = min(seconds, time.perf_counter() - start)
+    count = sum(map(len, tokens))
+    unique = len({token for block in tokens for token in block})
+    return count, unique, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=1_000_000)
+    parser.add_argument("--file")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8", errors="replace") as file:
+            blocks = file.read().splitlines()
+    else:
+        blocks = generate_blocks(args.words)
+    megabytes = sum(map(len, blocks)) / 1024**2
+    for name, split in (("whitespace split", split_words), ("tokenizer", tokenize)):
+        count, unique, seconds = measure(split, blocks, args.repeats)
+        print(
+            f"{name}: {count / seconds / 1e6:.2f}M tokens/s, "
+            f"{megabytes / seconds:.1f} MB/s, {count} tokens, {unique} unique"
+        )
+
+
+if __name__ == "__main__":
+    main()
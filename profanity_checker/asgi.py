@@ -11,6 +11,23 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from api.sessions import close_client_session
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "profanity_checker.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    # Django serves HTTP only, the lifespan protocol closes the aiohttp
+    # sessions of the worker's event loop when the server shuts down
+    if scope["type"] != "lifespan":
+        return await django_application(scope, receive, send)
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_client_session()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/4.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
+import os
 import socket
 from pathlib import Path
 
@@ -85,7 +86,19 @@ CACHES = {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
             "PARSER_CLASS": "redis.connection.HiredisParser",
         },
-    }
+    },
+    # Verdicts of single words, expiring so that a Redis server configured with
+    # maxmemory-policy volatile-lru bounds them without evicting other keys
+    "words": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": env("WORD_CACHE_URL", default=env("CACHE_URL")),
+        "TIMEOUT": env.int("WORD_CACHE_TIMEOUT", default=7 * 24 * 60 * 60),
+        "KEY_PREFIX": "word",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "PARSER_CLASS": "redis.connection.HiredisParser",
+        },
+    },
 }
 
 # Password validation
@@ -137,11 +150,205 @@ REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": ["drf_ujson.renderers.UJSONRenderer"],
 }
 
+# Profanity checking
+# "local" matches pages against PROFANITY_WORDLIST in-process, "remote" queries
+# PurgoMalum only, "crosscheck" confirms pages found clean locally with PurgoMalum
+
+PROFANITY_BACKEND = env("PROFANITY_BACKEND", default="local")
+
+PROFANITY_WORDLIST = env(
+    "PROFANITY_WORDLIST", default=str(BASE_DIR / "api" / "data" / "profanity_words.txt")
+)
+
+PURGOMALUM_URL = env(
+    "PURGOMALUM_URL",
+    default="https://www.purgomalum.com/service/containsprofanity?text=",
+)
+
+# Connections to PurgoMalum are kept alive in a pool of PURGOMALUM_POOL_SIZE,
+# requested from PURGOMALUM_WORKERS threads shared by all checks
+
+PURGOMALUM_POOL_SIZE = env.int("PURGOMALUM_POOL_SIZE", default=32)
+
+PURGOMALUM_WORKERS = env.int("PURGOMALUM_WORKERS", default=32)
+
+# A check has at most PURGOMALUM_CHUNKS_PER_CHECK chunks of words in flight.
+# Chunks are sized so that requests take about PURGOMALUM_CHUNK_LATENCY
+# seconds, from the round trip and time per byte fitted on the observed upstream
+# latency, up to the longest text accepted
+
+PURGOMALUM_CHUNKS_PER_CHECK = env.int("PURGOMALUM_CHUNKS_PER_CHECK", default=8)
+
+PURGOMALUM_CHUNK_LATENCY = env.float("PURGOMALUM_CHUNK_LATENCY", default=1)
+
+# Serve /v1/check with a native async view, for ASGI deployments
+
+ASYNC_CHECK = env.bool("ASYNC_CHECK", default=False)
+
+# Pages are read and tokenized in chunks of PAGE_CHUNK_SIZE bytes, at most
+# PAGE_MAX_BYTES are read per page
+
+PAGE_CHUNK_SIZE = env.int("PAGE_CHUNK_SIZE", default=64 * 1024)
+
+PAGE_MAX_BYTES = env.int("PAGE_MAX_BYTES", default=10 * 1024 * 1024)
+
+# Pages of more than PARSE_INLINE_MAX_BYTES are parsed and matched in a pool
+# of PARSE_PROCESSES processes, if any, instead of on the request thread. The
+# pool is replaced after PARSE_MAX_TASKS pages, releasing what parsers grew to.
+# Each process serving requests holds at most PARSE_PROCESSES pages in shared
+# memory, see /dev/shm in the README
+
+PARSE_PROCESSES = env.int("PARSE_PROCESSES", default=0)
+
+PARSE_INLINE_MAX_BYTES = env.int("PARSE_INLINE_MAX_BYTES", default=1024 * 1024)
+
+PARSE_MAX_TASKS = env.int("PARSE_MAX_TASKS", default=1000)
+
+# Pages are fetched through keep-alive pools of FETCH_POOL_SIZE connections
+# for each of at most FETCH_MAX_HOSTS hosts, with addresses cached for
+# FETCH_DNS_TTL seconds. Connecting and each read time out after
+# FETCH_CONNECT_TIMEOUT and FETCH_READ_TIMEOUT seconds
+
+FETCH_POOL_SIZE = env.int("FETCH_POOL_SIZE", default=4)
+
+FETCH_MAX_HOSTS = env.int("FETCH_MAX_HOSTS", default=100)
+
+FETCH_DNS_TTL = env.int("FETCH_DNS_TTL", default=300)
+
+FETCH_CONNECT_TIMEOUT = env.float("FETCH_CONNECT_TIMEOUT", default=5)
+
+FETCH_READ_TIMEOUT = env.float("FETCH_READ_TIMEOUT", default=10)
+
+FETCH_MAX_REDIRECTS = env.int("FETCH_MAX_REDIRECTS", default=5)
+
+# Pages of /v1/sites ordered with order_by have SITES_PAGE_SIZE sites unless
+# page_size is given, which is at most SITES_MAX_PAGE_SIZE
+
+SITES_PAGE_SIZE = env.int("SITES_PAGE_SIZE", default=100)
+
+SITES_MAX_PAGE_SIZE = env.int("SITES_MAX_PAGE_SIZE", default=1000)
+
+# /v1/sites with export streams sites read SITES_EXPORT_CHUNK_SIZE at a time
+
+SITES_EXPORT_CHUNK_SIZE = env.int("SITES_EXPORT_CHUNK_SIZE", default=2000)
+
+# Listings of /v1/sites kept in Redis are rebuilt from the table after
+# SITES_LISTING_TIMEOUT seconds, picking up sites changed other than by checks
+
+SITES_LISTING_TIMEOUT = env.int("SITES_LISTING_TIMEOUT", default=60 * 60)
+
+# POST /v1/checks checks at most BULK_CHECK_MAX_URLS URLs per request, with at
+# most BULK_CHECK_CONCURRENCY checks in flight of which BULK_CHECK_PER_HOST per
+# host, and stores results in batches of BULK_CHECK_BATCH_SIZE
+
+BULK_CHECK_MAX_URLS = env.int("BULK_CHECK_MAX_URLS", default=10000)
+
+BULK_CHECK_CONCURRENCY = env.int("BULK_CHECK_CONCURRENCY", default=32)
+
+BULK_CHECK_PER_HOST = env.int("BULK_CHECK_PER_HOST", default=4)
+
+BULK_CHECK_BATCH_SIZE = env.int("BULK_CHECK_BATCH_SIZE", default=100)
+
+# GET /v1/crawl follows same-origin links at most CRAWL_MAX_DEPTH deep and
+# checks at most CRAWL_MAX_PAGES pages, unless a request asks for fewer. At most
+# CRAWL_CONCURRENCY pages are fetched at a time, with requests starting at
+# least CRAWL_DELAY seconds apart
+
+CRAWL_MAX_DEPTH = env.int("CRAWL_MAX_DEPTH", default=3)
+
+CRAWL_MAX_PAGES = env.int("CRAWL_MAX_PAGES", default=100)
+
+CRAWL_CONCURRENCY = env.int("CRAWL_CONCURRENCY", default=2)
+
+CRAWL_DELAY = env.float("CRAWL_DELAY", default=0.5)
+
+# manage.py recheck re-checks sites last checked more than RECHECK_MAX_AGE
+# seconds ago, RECHECK_BATCH_SIZE at a time with RECHECK_WORKERS threads,
+# starting at most RECHECK_RATE checks per second (0 for no limit). Sites are
+# claimed for RECHECK_LEASE_TIMEOUT seconds, after which failed re-checks and
+# those of instances that died are claimed again
+
+RECHECK_MAX_AGE = env.int("RECHECK_MAX_AGE", default=24 * 60 * 60)
+
+RECHECK_BATCH_SIZE = env.int("RECHECK_BATCH_SIZE", default=100)
+
+RECHECK_WORKERS = env.int("RECHECK_WORKERS", default=8)
+
+RECHECK_RATE = env.float("RECHECK_RATE", default=0)
+
+RECHECK_LEASE_TIMEOUT = env.int("RECHECK_LEASE_TIMEOUT", default=10 * 60)
+
+# manage.py runjobs requeues jobs still running JOB_LEASE_TIMEOUT seconds after
+# they were claimed, e.g. by a worker that was killed. It should be longer than
+# any check takes
+
+JOB_LEASE_TIMEOUT = env.int("JOB_LEASE_TIMEOUT", default=10 * 60)
+
+# manage.py runjobs deletes jobs finished more than JOB_RETENTION seconds ago,
+# after which their results are no longer retrievable (0 keeps them)
+
+JOB_RETENTION = env.int("JOB_RETENTION", default=7 * 24 * 60 * 60)
+
+# manage.py serve runs SERVE_WORKERS worker processes, each with SERVE_THREADS
+# threads under WSGI. A worker is replaced after SERVE_MAX_REQUESTS requests
+# plus up to SERVE_MAX_REQUESTS_JITTER, so that workers are not all replaced at
+# once (0 never replaces them), and on reloads finishes its requests within
+# SERVE_GRACEFUL_TIMEOUT seconds
+
+SERVE_WORKERS = env.int("SERVE_WORKERS", default=os.cpu_count())
+
+SERVE_THREADS = env.int("SERVE_THREADS", default=4)
+
+SERVE_MAX_REQUESTS = env.int("SERVE_MAX_REQUESTS", default=10000)
+
+SERVE_MAX_REQUESTS_JITTER = env.int("SERVE_MAX_REQUESTS_JITTER", default=1000)
+
+SERVE_GRACEFUL_TIMEOUT = env.int("SERVE_GRACEFUL_TIMEOUT", default=30)
+
+# Results of /v1/check are stored before responding unless RESULT_FLUSH_INTERVAL
+# is set, they are then written behind in batches, once RESULT_BATCH_SIZE are
+# buffered or RESULT_FLUSH_INTERVAL seconds have passed. Buffered results are not
+# yet read by /v1/site, /v1/sites or max_age, and are lost if the process dies
+
+RESULT_BATCH_SIZE = env.int("RESULT_BATCH_SIZE", default=100)
+
+RESULT_FLUSH_INTERVAL = env.float("RESULT_FLUSH_INTERVAL", default=0)
+
+# Concurrent checks of the same URL share one check, in a process and across
+# processes through the default cache. Callers wait for it at most
+# SINGLE_FLIGHT_TIMEOUT seconds before checking on their own
+
+SINGLE_FLIGHT_TIMEOUT = env.int("SINGLE_FLIGHT_TIMEOUT", default=60)
+
+# /v1/check responds with the stored result of sites checked at most
+# CHECK_MAX_AGE seconds ago, unless a request passes its own max_age (0 always
+# checks)
+
+CHECK_MAX_AGE = env.int("CHECK_MAX_AGE", default=0)
+
+# Examples of the date and time parameters in the schema are medians of the
+# stored sites, computed on request and cached for SCHEMA_EXAMPLES_TIMEOUT
+# seconds
+
+SCHEMA_EXAMPLES_TIMEOUT = env.int("SCHEMA_EXAMPLES_TIMEOUT", default=60 * 60)
+
+# Per-stage timings of check, site and sites requests are exported as
+# Prometheus metrics on /metrics and in the Server-Timing header if METRICS
+
+METRICS = env.bool("METRICS", default=False)
+
+if METRICS:
+    MIDDLEWARE.insert(0, "api.metrics.server_timing_middleware")
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Profanity Checker",
     "DESCRIPTION": "<b>REST</b>ful __API__ that can tell whether a site contains profanity<br><br>Internally makes use of third-party RESTful API <a style='text-decoration:none' href='https://www.purgomalum.com'>PurgoMalum</a><br><br>Intended for checking sites that contain English text and not require authentication",
     "VERSION": "1",
     "SERVE_INCLUDE_SCHEMA": False,
+    "POSTPROCESSING_HOOKS": [
+        "drf_spectacular.hooks.postprocess_schema_enums",
+        "api.schema.add_datetime_examples",
+    ],
     "SWAGGER_UI_SETTINGS": {
         "docExpansion": "full",
         "filter": True,
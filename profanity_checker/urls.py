@@ -2,7 +2,12 @@ from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
+from api.metrics import metrics
+
 urlpatterns = [path("admin/", admin.site.urls), path("api/", include("api.urls"))]
 
+if settings.METRICS:
+    urlpatterns.append(path("metrics", metrics))
+
 if settings.DEBUG:
     urlpatterns.append(path("__debug__/", include("debug_toolbar.urls")))